@@ -58,6 +58,14 @@ def anaylze_experiment(experiment):
     p_values, p, rho, rho_p = find_rank(splits, True)
     print("Splits: ", p_values, p, rho, rho_p)
 
+    if all('search_time' in data[difficulty] for difficulty in DIFFICULTY):
+        # Newer experiments time the search apart from parsing.
+        search_times = [data[difficulty]['search_time']
+                        for difficulty in DIFFICULTY]
+
+        p_values, p, rho, rho_p = find_rank(search_times)
+        print("Search times", p_values, p, rho, rho_p)
+
     '''
     plt.figure()
     plt.suptitle("Splits")
@@ -0,0 +1,376 @@
+"""
+Solve many problems in parallel.
+
+Problems are CNF files or raw sudoku puzzles that are solved against the
+shared ruleset. Every repeat of a problem is a task, and tasks are handed
+to a pool of worker processes in chunks. Each task seeds the random
+number generator from its own description, so the results do not depend
+on the number of processes or on the worker that picks a task up. A task
+that runs longer than its timeout stops with the statistics it gathered
+so far; the few that do not stop in time are abandoned.
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+
+from multiprocessing import Pool, cpu_count
+
+from solver import select_solver
+from sudoku import load_database, load_rules, load_raw_sudokus
+from sudoku import read_raw_sudoku
+
+# Seconds that a task may overrun its timeout before it is abandoned.
+GRACE = 1.0
+
+# Records and seconds between two syncs of a record file to disk.
+SYNC_RECORDS = 16
+SYNC_INTERVAL = 5.0
+
+
+class Timeout(Exception):
+    """
+    Raised in a worker when a task runs out of time.
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise Timeout()
+
+
+def _initialize_worker():
+    # Workers share the terminal of the parent, keep their progress
+    # output out of it.
+    sys.stdout = open(os.devnull, 'w')
+
+
+class RecordWriter():
+    """
+    Append JSON records to a file, one per line.
+
+    Every record is flushed to the operating system right away, so the
+    file can be read while it grows, but it is only synced to disk every
+    `sync_records` records or `sync_interval` seconds, and when the
+    writer is closed. A partial last line left by a crash is removed
+    before anything is appended.
+
+    Parameters
+    ----------
+    path : str
+    sync_records : int, optional
+    sync_interval : float, optional
+    """
+    def __init__(self, path, sync_records=SYNC_RECORDS,
+                 sync_interval=SYNC_INTERVAL):
+        self.path = path
+        self.sync_records = sync_records
+        self.sync_interval = sync_interval
+        self.file = None
+        self.pending = 0
+        self.last_sync = 0.0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        """
+        Open the file for appending.
+        """
+        _truncate_partial_line(self.path)
+
+        self.file = open(self.path, 'a')
+        self.last_sync = time.perf_counter()
+
+    def write(self, record):
+        """
+        Append a record.
+        """
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        self.pending += 1
+
+        if self.pending >= self.sync_records or \
+                time.perf_counter() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        Make sure the records written so far are on disk.
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.perf_counter()
+
+    def close(self):
+        """
+        Sync and close the file.
+        """
+        if self.file is None:
+            return
+
+        self.sync()
+        self.file.close()
+        self.file = None
+
+
+def _truncate_partial_line(path):
+    """
+    Remove everything after the last newline of a file.
+    """
+    try:
+        file = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+
+    with file:
+        data = file.read()
+
+        if data and not data.endswith(b"\n"):
+            file.truncate(data.rfind(b"\n") + 1)
+
+
+def read_records(path):
+    """
+    Read the records written by a `RecordWriter`.
+
+    Returns
+    -------
+    list of dict
+        The complete records, a partial last line is skipped.
+    """
+    records = []
+
+    try:
+        file = open(path)
+    except FileNotFoundError:
+        return records
+
+    with file:
+        for line in file:
+            if not line.endswith("\n"):
+                break
+
+            records.append(json.loads(line))
+
+    return records
+
+
+def cnf_problems(paths):
+    """
+    Describe CNF files as problems.
+    """
+    return [('cnf', path) for path in paths]
+
+
+def sudoku_problems(path):
+    """
+    Describe the raw sudoku puzzles in a file as problems.
+    """
+    return [('sudoku', raw) for raw in load_raw_sudokus(path) if raw]
+
+
+def load_problem(problem):
+    """
+    Load the clauses of a problem.
+
+    Parameters
+    ----------
+    problem : tuple of str
+        The kind of problem, 'cnf' or 'sudoku', and the path of a CNF
+        file or a raw sudoku puzzle.
+
+    Returns
+    -------
+    ClauseDatabase
+    """
+    kind, value = problem
+
+    if kind == 'cnf':
+        return load_database(value)
+    elif kind == 'sudoku':
+        return load_rules().with_clauses(read_raw_sudoku(value))
+
+    raise ValueError(f"Unknown kind of problem '{kind}'.")
+
+
+def measure(solver, satisfied, runtime, cpu_time, parse_time=0.0):
+    """
+    Collect the measurements of a finished solver.
+
+    Besides the keys below, the measurements contain the statistics of
+    the solver, see `profiling.Statistics`.
+
+    Returns
+    -------
+    dict
+    """
+    measurements = solver.statistics(parse_time).as_dict()
+    measurements.update({
+        'satisfied': satisfied,
+        'timeout': solver.exhausted == 'time',
+        'runtime': runtime,
+        'cpu_time': cpu_time,
+        'memory': solver.clauses.nbytes,
+        'exhausted': solver.exhausted,
+        'flips': getattr(solver, 'flips', None),
+        'restarts': getattr(solver, 'restarts', None),
+        'flips_per_second': getattr(solver, 'flips_per_second', None),
+    })
+
+    return measurements
+
+
+def solve_task(task):
+    """
+    Load and solve a single problem.
+
+    Parameters
+    ----------
+    task : tuple
+        The problem, the strategy, the random seed and the timeout in
+        seconds, or None for no timeout.
+
+    Returns
+    -------
+    dict
+        The measurements of the solver, see `measure`. Only the runtime
+        and the CPU time are known for tasks that were abandoned.
+    """
+    problem, strategy, seed, timeout = task
+    random.seed(seed)
+
+    # The solver stops itself at the timeout. SIGALRM, which is not
+    # available everywhere, abandons tasks that overrun it anyway.
+    alarm = timeout is not None and hasattr(signal, 'setitimer')
+
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout + GRACE)
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    try:
+        clauses = load_problem(problem)
+        parse_time = time.perf_counter() - start
+
+        solver = select_solver(clauses, strategy, silent=True)
+
+        if timeout is not None:
+            solver.set_budget(seconds=timeout - (time.perf_counter() - start))
+
+        satisfied = solver.solve()
+    except Timeout:
+        return {'satisfied': None, 'timeout': True,
+                'runtime': time.perf_counter() - start,
+                'cpu_time': time.process_time() - cpu_start}
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    return measure(solver, satisfied, time.perf_counter() - start,
+                   time.process_time() - cpu_start, parse_time)
+
+
+def run_batch(problems, strategy, repeats=1, processes=None, chunksize=None,
+              timeout=None, seed=0):
+    """
+    Solve problems in a pool of worker processes.
+
+    Parameters
+    ----------
+    problems : list of tuple
+        Problems as returned by `cnf_problems` or `sudoku_problems`.
+    strategy : int
+        The strategy of the solver, see `solver.run`.
+    repeats : int, optional
+        Number of times each problem is solved.
+    processes : int, optional
+        Number of worker processes, by default the number of cores. A
+        single process solves the problems without a pool.
+    chunksize : int, optional
+        Number of tasks sent to a worker at once. By default the tasks
+        are split in about four chunks per process.
+    timeout : float, optional
+        Seconds after which a task is abandoned.
+    seed : int, optional
+        Seed from which the seed of every task is derived.
+
+    Yields
+    ------
+    list of dict
+        The measurements of the repeats of each problem, in the order of
+        the problems.
+    """
+    if processes is None:
+        processes = cpu_count()
+
+    tasks = [(problem, strategy, f"{seed}:{problem[1]}:{repeat}", timeout)
+             for problem in problems for repeat in range(repeats)]
+
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (4 * processes))
+
+    if processes == 1:
+        results = map(solve_task, tasks)
+
+        for problem in problems:
+            yield [next(results) for repeat in range(repeats)]
+
+        return
+
+    with Pool(processes, initializer=_initialize_worker) as pool:
+        results = pool.imap(solve_task, tasks, chunksize)
+
+        for problem in problems:
+            yield [next(results) for repeat in range(repeats)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Solve CNF files or a file of raw sudokus in parallel.")
+    parser.add_argument('-S', metavar='N', dest='strategy', type=int,
+                        default=1, help="The strategy to apply to a problem.")
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help="Number of worker processes.")
+    parser.add_argument('-r', '--repeats', type=int, default=1,
+                        help="Number of times each problem is solved.")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Seconds after which a problem is abandoned.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the random number generators.")
+    parser.add_argument('--sudokus', action='store_true',
+                        help="Read raw sudokus from the files instead of "
+                             "CNF.")
+    parser.add_argument(metavar='FILE', dest='files', nargs='+',
+                        help="Input files.")
+    args = parser.parse_args()
+
+    if args.sudokus:
+        problems = [problem for path in args.files
+                    for problem in sudoku_problems(path)]
+    else:
+        problems = cnf_problems(args.files)
+
+    start = time.perf_counter()
+    results = [result for runs in run_batch(
+        problems, args.strategy, args.repeats, args.processes,
+        timeout=args.timeout, seed=args.seed) for result in runs]
+    elapsed = time.perf_counter() - start
+
+    satisfied = sum(result['satisfied'] is True for result in results)
+    timeouts = sum(result['timeout'] for result in results)
+    total = sum(result['cpu_time'] for result in results)
+
+    print(f"Satisfied: {satisfied}/{len(results)} | Timeouts: {timeouts} | "
+          f"Wall time: {elapsed:.2f}s | CPU time: {total:.2f}s | "
+          f"Speedup: {total / elapsed:.2f}")
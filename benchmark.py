@@ -0,0 +1,261 @@
+"""
+Benchmark the solvers on the bundled problems.
+
+Every instance is solved by every strategy a few times after a warmup
+run, each time with the same seed, and the median parse and solve times
+are kept. Parsing always reads the text of an instance, never the
+binary cache. The results can be saved as a baseline, and later runs
+are compared to it: instances that became slower by more than a
+threshold, or whose answer changed, are flagged as regressions.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+
+from statistics import median
+
+from solver import select_solver
+from sudoku import load_database, load_raw_sudokus, read_raw_sudoku
+from sudoku import RULES_PATH
+
+DIMACS = ['aim-50-1_6-yes1-4.cnf', 'zebra_v155_c1135.cnf', 'par8-1-c.cnf',
+          'bf0432-007.cnf']
+PUZZLES = 'puzzles'
+SUDOKUS = '*.sdk.txt'
+
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Strategies that are benchmarked by default, CDCL with VSIDS.
+DEFAULT_STRATEGIES = [6]
+
+
+def find_instances(sudokus=5):
+    """
+    Collect the instances of the benchmark.
+
+    Parameters
+    ----------
+    sudokus : int, optional
+        Number of puzzles taken from the start of each sudoku collection.
+
+    Returns
+    -------
+    list of tuple
+        The name of each instance, the kind of problem, 'cnf' or
+        'sudoku', and the path of a CNF file or a raw sudoku puzzle.
+    """
+    instances = [(path, 'cnf', path) for path in DIMACS
+                 if os.path.exists(path)]
+    instances.extend((path, 'cnf', path) for path
+                     in sorted(glob.glob(os.path.join(PUZZLES, '*.cnf'))))
+
+    for path in sorted(glob.glob(SUDOKUS)):
+        raws = [raw for raw in load_raw_sudokus(path) if raw]
+
+        instances.extend((f"{path}:{idx}", 'sudoku', raw)
+                         for idx, raw in enumerate(raws[:sudokus]))
+
+    return instances
+
+
+def parse(kind, value):
+    """
+    Read the clauses of an instance without the binary cache. Sudokus
+    parse the rules anew instead of sharing them, see `load_rules`.
+    """
+    if kind == 'cnf':
+        return load_database(value, cache=None)
+    elif kind == 'sudoku':
+        return load_database(RULES_PATH, cache=None).with_clauses(
+            read_raw_sudoku(value))
+
+    raise ValueError(f"Unknown kind of problem '{kind}'.")
+
+
+def time_run(kind, value, strategy, seed, timeout):
+    """
+    Parse and solve an instance once.
+
+    Returns
+    -------
+    dict
+        The parse and solve times, where solving includes building the
+        solver, and the answer and statistics of the solver.
+    """
+    random.seed(seed)
+
+    start = time.perf_counter()
+    clauses = parse(kind, value)
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solver = select_solver(clauses, strategy, silent=True)
+    solver.set_budget(seconds=timeout)
+    satisfied = solver.solve()
+    solve_time = time.perf_counter() - start
+
+    result = solver.statistics(parse_time).as_dict()
+    result.update(satisfied=satisfied, solve_time=solve_time)
+
+    return result
+
+
+def benchmark(instances, strategies, repeats=3, warmup=1, timeout=10.0,
+              seed=0, silent=False):
+    """
+    Time every strategy on every instance.
+
+    Parameters
+    ----------
+    instances : list of tuple
+        Instances as returned by `find_instances`.
+    strategies : list of int
+        The strategies to benchmark, see `solver.run`.
+    repeats : int, optional
+        Number of timed runs of each instance.
+    warmup : int, optional
+        Number of untimed runs before the timed ones.
+    timeout : float, optional
+        Seconds after which a run gives up, see `Solver.set_budget`.
+    seed : int, optional
+        Seed from which the seed of every instance is derived. All runs
+        of an instance use the same seed.
+    silent : bool, optional
+        Do not print the result of every instance.
+
+    Returns
+    -------
+    dict
+        Maps '<strategy>:<instance>' to the median parse and solve time,
+        the answer and the median number of splits.
+    """
+    results = {}
+
+    for strategy in strategies:
+        for name, kind, value in instances:
+            run_seed = f"{seed}:{name}"
+
+            for run in range(warmup):
+                time_run(kind, value, strategy, run_seed, timeout)
+
+            runs = [time_run(kind, value, strategy, run_seed, timeout)
+                    for run in range(repeats)]
+
+            key = f"{strategy}:{name}"
+            results[key] = {
+                'parse_time': median(run['parse_time'] for run in runs),
+                'solve_time': median(run['solve_time'] for run in runs),
+                'satisfied': runs[0]['satisfied'],
+                'splits': median(run['splits'] for run in runs),
+            }
+
+            if not silent:
+                result = results[key]
+                print(f"{key:<40} parse {result['parse_time']:8.4f}s | "
+                      f"solve {result['solve_time']:8.4f}s | "
+                      f"{result['satisfied']}")
+
+    return results
+
+
+def compare(results, baseline, threshold=0.2, min_time=0.001):
+    """
+    Find the instances that regressed compared to a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        Results as returned by `benchmark`.
+    baseline : dict
+        Earlier results.
+    threshold : float, optional
+        Relative increase of the parse or solve time that counts as a
+        regression.
+    min_time : float, optional
+        Increases of fewer seconds than this are noise.
+
+    Returns
+    -------
+    list of str
+        A description of every regression.
+    """
+    regressions = []
+
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        before = baseline[key]
+
+        if result['satisfied'] != before['satisfied']:
+            regressions.append(f"{key}: answer changed from "
+                               f"{before['satisfied']} to "
+                               f"{result['satisfied']}")
+
+        for timing in ['parse_time', 'solve_time']:
+            increase = result[timing] - before[timing]
+
+            if increase > min_time and increase > threshold * before[timing]:
+                regressions.append(
+                    f"{key}: {timing} {before[timing]:.4f}s -> "
+                    f"{result[timing]:.4f}s "
+                    f"(+{100 * increase / before[timing]:.0f}%)")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the solvers and compare to a baseline.")
+    parser.add_argument('-S', metavar='N,N,...', dest='strategies',
+                        default=None, help="The strategies to benchmark.")
+    parser.add_argument('-r', '--repeats', type=int, default=3,
+                        help="Number of timed runs of each instance.")
+    parser.add_argument('-w', '--warmup', type=int, default=1,
+                        help="Number of untimed runs of each instance.")
+    parser.add_argument('--sudokus', type=int, default=5,
+                        help="Number of puzzles of each sudoku collection.")
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help="Seconds after which a run gives up.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the random number generators.")
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help="The baseline file.")
+    parser.add_argument('--save', action='store_true',
+                        help="Save the results as the new baseline.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown that counts as a "
+                             "regression.")
+    args = parser.parse_args()
+
+    if args.strategies is None:
+        strategies = DEFAULT_STRATEGIES
+    else:
+        strategies = [int(strategy) for strategy
+                      in args.strategies.split(',') if strategy]
+
+    results = benchmark(find_instances(args.sudokus), strategies,
+                        args.repeats, args.warmup, args.timeout, args.seed)
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.threshold)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        print(f"{len(regressions)} regressions against {args.baseline}")
+
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,243 @@
+"""
+Evaluate clauses with bitsets.
+
+Python integers serve as bitsets of any size. An assignment becomes the
+bitset of its true variables and the bitset of its false variables, and
+each literal gets the bitset of the clauses it occurs in, so the
+clauses satisfied by an assignment are the union of the bitsets of its
+true literals: one OR per variable instead of a check per literal.
+"""
+import argparse
+
+from database import ClauseDatabase
+from sudoku import load_database
+
+
+def _bits(indices, size):
+    """
+    Pack indices smaller than `size` into a bitset.
+    """
+    bitmap = bytearray((size + 7) // 8)
+
+    for index in indices:
+        bitmap[index >> 3] |= 1 << (index & 7)
+
+    return int.from_bytes(bitmap, 'little')
+
+
+def _indices(bits):
+    """
+    Unpack a bitset into a list of indices, in increasing order.
+    """
+    indices = []
+
+    while bits:
+        lowest = bits & -bits
+        indices.append(lowest.bit_length() - 1)
+        bits ^= lowest
+
+    return indices
+
+
+class BitEvaluator():
+    """
+    Check assignments against a fixed set of clauses.
+
+    Building the evaluator reads every literal once. After that, checking
+    a full assignment costs one OR of two clause bitsets per variable,
+    and checking a single clause costs two ANDs of variable bitsets.
+
+    Clauses that contain a literal and its negation count as satisfied
+    by any assignment. The complete solvers drop them and leave the
+    variables that only occur in them unassigned.
+
+    Parameters
+    ----------
+    clauses : ClauseDatabase or iterable of iterable of int
+    """
+    def __init__(self, clauses):
+        self.clauses = ClauseDatabase.from_clauses(clauses)
+        self.max_variable = self.clauses.max_variable
+        self.all_clauses = (1 << len(self.clauses)) - 1
+
+        # Clauses of each literal, indexed like the occurrences.
+        self.occurrences = [
+            _bits(self.clauses.occurrences_of(literal), len(self.clauses))
+            if literal != 0 else 0
+            for literal in range(-self.max_variable, self.max_variable + 1)]
+
+        # Tautological clauses, satisfied whatever the assignment.
+        occurrences = self.occurrences
+        self.tautologies = 0
+
+        for variable in range(1, self.max_variable + 1):
+            self.tautologies |= occurrences[self.max_variable + variable] \
+                & occurrences[self.max_variable - variable]
+
+        # Positive and negative variables of each clause, built when a
+        # single clause is first checked.
+        self.positive = None
+        self.negative = None
+
+    def pack(self, assignment):
+        """
+        Pack an assignment into bitsets.
+
+        Parameters
+        ----------
+        assignment : dict or list
+            Maps variables to True, False or None for unassigned.
+
+        Returns
+        -------
+        int
+            The bitset of the true variables.
+        int
+            The bitset of the false variables.
+        """
+        if isinstance(assignment, dict):
+            items = assignment.items()
+        else:
+            items = enumerate(assignment)
+
+        true = []
+        false = []
+
+        for variable, value in items:
+            if value is True:
+                true.append(variable)
+            elif value is False:
+                false.append(variable)
+
+        size = self.max_variable + 1
+
+        return _bits(true, size), _bits(false, size)
+
+    def satisfied_clauses(self, assignment):
+        """
+        Compute the bitset of the clauses that an assignment satisfies.
+
+        Parameters
+        ----------
+        assignment : dict or list
+            Maps variables to True, False or None for unassigned.
+
+        Returns
+        -------
+        int
+        """
+        if isinstance(assignment, dict):
+            items = assignment.items()
+        else:
+            items = enumerate(assignment)
+
+        occurrences = self.occurrences
+        max_variable = self.max_variable
+        satisfied = self.tautologies
+
+        for variable, value in items:
+            if value is None or not 0 < variable <= max_variable:
+                continue
+
+            if value:
+                satisfied |= occurrences[variable + max_variable]
+            else:
+                satisfied |= occurrences[max_variable - variable]
+
+        return satisfied
+
+    def satisfies(self, assignment):
+        """
+        Check whether an assignment satisfies every clause.
+        """
+        return self.satisfied_clauses(assignment) == self.all_clauses
+
+    def unsatisfied(self, assignment):
+        """
+        Find the clauses that an assignment does not satisfy.
+
+        Returns
+        -------
+        list of int
+            Indices of the clauses.
+        """
+        return _indices(self.all_clauses
+                        & ~self.satisfied_clauses(assignment))
+
+    def clause_satisfied(self, idx, true, false):
+        """
+        Check a single clause against a packed assignment, see `pack`.
+        """
+        if self.positive is None:
+            size = self.max_variable + 1
+            self.positive = [_bits([literal for literal in clause
+                                    if literal > 0], size)
+                             for clause in self.clauses]
+            self.negative = [_bits([-literal for literal in clause
+                                    if literal < 0], size)
+                             for clause in self.clauses]
+
+        if self.tautologies >> idx & 1:
+            return True
+
+        return bool(self.positive[idx] & true or self.negative[idx] & false)
+
+
+def read_assignment(path):
+    """
+    Read an assignment from a `.out` file, one literal per line.
+
+    Returns
+    -------
+    dict
+        Maps every variable in the file to its value.
+    """
+    assignment = {}
+
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+
+            if line:
+                literal = int(line)
+                assignment[abs(literal)] = literal > 0
+
+    return assignment
+
+
+def verify(clauses, path):
+    """
+    Check the assignment in a `.out` file against clauses.
+
+    Parameters
+    ----------
+    clauses : ClauseDatabase or iterable of iterable of int
+    path : str
+        Path of the `.out` file.
+
+    Returns
+    -------
+    list of int
+        Indices of the clauses that are not satisfied.
+    """
+    return BitEvaluator(clauses).unsatisfied(read_assignment(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the assignment of a CNF file.")
+    parser.add_argument(metavar='CNF', dest='cnf',
+                        help="Input file in DIMACS CNF format.")
+    parser.add_argument(metavar='OUT', dest='out', nargs='?', default=None,
+                        help="The assignment, by default the `.out` file "
+                             "of the CNF file.")
+    args = parser.parse_args()
+
+    path = args.out or args.cnf + '.out'
+    unsatisfied = verify(load_database(args.cnf), path)
+
+    if unsatisfied:
+        print(f"{len(unsatisfied)} unsatisfied clauses, the first is "
+              f"{unsatisfied[0]}")
+    else:
+        print("All clauses are satisfied")
@@ -0,0 +1,303 @@
+"""
+Split the search space of a problem and solve the parts in parallel.
+
+A problem is first split into cubes: the decisions along every branch of
+a search tree of a fixed depth, where each split is chosen by the
+heuristic of a strategy and followed by unit propagation. Branches that
+run into a conflict are refuted on the spot. The remaining cubes are put
+on a shared queue, from which every worker process takes the next cube
+as soon as it is done with the previous one, so workers that finish easy
+cubes steal the work that would otherwise wait behind hard ones. The
+first satisfiable cube ends the search; the problem is unsatisfiable
+once every cube is.
+"""
+import os
+import sys
+import time
+import queue
+import random
+import argparse
+
+from multiprocessing import Process, Queue, cpu_count
+
+from solver import CDCLSolver, select_solver, write_assignment
+from portfolio import INCOMPLETE
+from sudoku import load_database
+
+# Counters that are added up over the cubes.
+STATISTICS = ['splits', 'conflicts', 'decisions', 'propagations']
+
+
+def _statistics(solver):
+    return {name: getattr(solver, name, 0) for name in STATISTICS}
+
+
+def make_cubes(solver, depth):
+    """
+    Split a problem into cubes.
+
+    Both branches of every split count as decisions of the solver, since
+    the cube literals are later solved as assumptions, which are not.
+
+    Parameters
+    ----------
+    solver : Solver
+        A fresh complete solver, whose heuristic chooses the splits.
+    depth : int
+        Number of splits in a cube.
+
+    Returns
+    -------
+    list of list of int
+        The cubes that were not refuted, in the order of the search.
+    dict or None
+        A satisfying assignment if one was found while splitting.
+    int
+        Number of refuted cubes.
+    """
+    if hasattr(solver, 'total_flips'):
+        raise ValueError("Cubes can only be made by a complete solver.")
+
+    if not solver._prepare():
+        return [], None, 1
+
+    cubes = []
+    refuted = 0
+    cube = []
+    trail = solver.trail
+    trail_lim = solver.trail_lim
+
+    # Each entry is the branch that is still to be tried at a level.
+    pending = []
+
+    while True:
+        conflict = solver._propagate()
+
+        if conflict is None and len(trail) == solver.num_variables:
+            return [], solver.assignment, refuted
+
+        if conflict is not None or len(trail_lim) == depth:
+            if conflict is not None:
+                refuted += 1
+                solver.conflicts += 1
+
+                if solver.heuristic is not None:
+                    solver.heuristic.conflict(solver._clause(conflict))
+            else:
+                cubes.append(list(cube))
+
+            # Return to the deepest split with an untried branch.
+            while pending and pending[-1] is None:
+                pending.pop()
+                cube.pop()
+
+            if not pending:
+                return cubes, None, refuted
+
+            level = len(pending) - 1
+            literal = pending[level]
+            pending[level] = None
+
+            solver._backtrack_to(level)
+            solver.splits += 1
+            solver.decisions += 1
+
+            cube[level] = literal
+            trail_lim.append(len(trail))
+            solver._enqueue(literal)
+            continue
+
+        literal, value = solver.split(solver)
+        solver.decisions += 1
+
+        if not value:
+            literal = -literal
+
+        pending.append(-literal)
+        cube.append(literal)
+        trail_lim.append(len(trail))
+        solver._enqueue(literal)
+
+
+def _conquer(cnf, strategy, seed, cubes, answers):
+    """
+    Solve cubes from a queue until it runs dry and report every answer.
+
+    CDCL solvers are kept for the whole run and solve each cube under
+    assumptions, so that clauses learned on one cube help with the next.
+    Other solvers are created anew with the cube as unit clauses.
+    """
+    sys.stdout = open(os.devnull, 'w')
+    random.seed(seed)
+
+    clauses = load_database(cnf)
+    solver = select_solver(clauses, strategy, silent=True)
+    incremental = isinstance(solver, CDCLSolver)
+
+    while True:
+        task = cubes.get()
+
+        if task is None:
+            return
+
+        index, cube = task
+
+        if incremental:
+            before = _statistics(solver)
+            satisfied = solver.solve(cube)
+            after = _statistics(solver)
+            statistics = {name: after[name] - before[name]
+                          for name in STATISTICS}
+        else:
+            solver = select_solver(
+                clauses.with_clauses([literal] for literal in cube),
+                strategy, silent=True)
+            satisfied = solver.solve()
+            statistics = _statistics(solver)
+
+        if satisfied:
+            answers.put((index, True, statistics,
+                         sorted(solver.assignment.items())))
+        else:
+            answers.put((index, False, statistics, []))
+
+
+def cube_and_conquer(cnf, depth=4, strategy=6, cube_strategy=7,
+                     processes=None, output=True, silent=False, seed=0):
+    """
+    Split a problem into cubes and solve them in parallel processes.
+
+    Parameters
+    ----------
+    cnf : str
+        Path to a DIMACS file.
+    depth : int, optional
+        Number of splits in a cube, so there are at most 2 ** depth
+        cubes.
+    strategy : int, optional
+        The complete strategy that solves the cubes, see `solver.run`.
+    cube_strategy : int, optional
+        The complete strategy whose heuristic splits the problem.
+    processes : int, optional
+        Number of worker processes, by default the number of cores.
+    output : bool, optional
+        Write the assignment to the `.out` file of the problem.
+    silent : bool, optional
+        Do not print the outcome.
+    seed : int, optional
+        Seed from which the seed of every process is derived.
+
+    Returns
+    -------
+    bool
+        Whether the problem is satisfiable.
+    dict
+        The satisfying assignment.
+    dict
+        The statistics of splitting and of every solved cube added up.
+        The splits are comparable to `Solver.splits` of a single solver.
+    """
+    def print_(string):
+        if not silent:
+            print(string)
+
+    if strategy in INCOMPLETE or cube_strategy in INCOMPLETE:
+        raise ValueError("Cubes can only be solved by a complete solver.")
+
+    if processes is None:
+        processes = cpu_count()
+
+    start = time.perf_counter()
+    random.seed(f"{seed}:cubes")
+
+    splitter = select_solver(load_database(cnf), cube_strategy, silent=True)
+    cubes, assignment, refuted = make_cubes(splitter, depth)
+
+    statistics = _statistics(splitter)
+    statistics.update(cubes=len(cubes), refuted=refuted, solved=0)
+    satisfied = assignment is not None
+
+    if cubes:
+        tasks = Queue()
+        answers = Queue()
+
+        for task in enumerate(cubes):
+            tasks.put(task)
+
+        workers = [Process(target=_conquer, daemon=True,
+                           args=(cnf, strategy, f"{seed}:{index}", tasks,
+                                 answers))
+                   for index in range(min(processes, len(cubes)))]
+
+        for worker in workers:
+            tasks.put(None)
+
+        for worker in workers:
+            worker.start()
+
+        try:
+            while statistics['solved'] < len(cubes) and not satisfied:
+                try:
+                    index, satisfied, solved, values = answers.get(
+                        timeout=0.1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers) \
+                            and answers.empty():
+                        raise RuntimeError("The workers stopped before "
+                                           "every cube was solved.")
+
+                    continue
+
+                statistics['solved'] += 1
+
+                for name in STATISTICS:
+                    statistics[name] += solved[name]
+
+                if satisfied:
+                    assignment = dict(values)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+            for worker in workers:
+                worker.join()
+
+    elapsed = time.perf_counter() - start
+
+    print_("Satisfied" if satisfied else "Unsatisfied")
+    print_(f"Cubes: {statistics['cubes']} | "
+           f"Refuted: {statistics['refuted']} | "
+           f"Solved: {statistics['solved']} | "
+           f"Splits: {statistics['splits']} | "
+           f"Time: {elapsed:.2f}s")
+
+    if assignment is None:
+        assignment = {}
+
+    if output:
+        write_assignment(cnf, satisfied, assignment)
+
+    return satisfied, assignment, statistics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Solve a CNF file by cube and conquer.")
+    parser.add_argument('-S', metavar='N', dest='strategy', type=int,
+                        default=6, help="The strategy that solves the cubes.")
+    parser.add_argument('-C', metavar='N', dest='cube_strategy', type=int,
+                        default=7, help="The strategy that splits the "
+                                        "problem into cubes.")
+    parser.add_argument('-d', '--depth', type=int, default=4,
+                        help="Number of splits in a cube.")
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help="Number of worker processes.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the random number generators.")
+    parser.add_argument(metavar='CNF', dest='cnf',
+                        help="Input file in DIMACS CNF format.")
+    args = parser.parse_args()
+
+    cube_and_conquer(args.cnf, args.depth, args.strategy, args.cube_strategy,
+                     args.processes, seed=args.seed)
@@ -0,0 +1,348 @@
+"""
+Compact storage for sets of clauses.
+
+The clauses are kept in a flat arena: a single contiguous array holds the
+literals of every clause back to back, and two more arrays hold the
+offset and the length of each clause. The clauses containing each literal
+are indexed the same way. Compared to a dictionary of sets this needs a
+few bytes per literal and no hashing to walk a clause.
+
+A database can be saved to a binary file holding a header followed by
+the raw arrays, and loaded again through a memory map without parsing
+or copying the arrays.
+"""
+import os
+import mmap
+import struct
+
+from array import array
+from collections import Counter
+from itertools import accumulate, chain, repeat
+from operator import add
+
+# Magic bytes, item size, source modification time and size, maximum
+# variable and the length of each of the six arrays.
+HEADER = struct.Struct('<8sqqqq6q')
+MAGIC = b'CNFDB\x00\x00\x01'
+
+
+def _extend(target, values):
+    """
+    Append an array or an integer memoryview to an array in bulk.
+    """
+    target.frombytes(memoryview(values).cast('B'))
+
+
+class ClauseDatabase():
+    """
+    Flat clause arena.
+
+    Clause `idx` occupies
+    `literals[offsets[idx]:offsets[idx] + lengths[idx]]`, with the clauses
+    stored back to back in order, and the indices
+    of the clauses that contain `literal` are stored in
+    `occurrences[occurrence_offsets[literal + max_variable]:
+    occurrence_offsets[literal + max_variable + 1]]`.
+
+    Parameters
+    ----------
+    literals : array of int
+        The literals of all clauses back to back.
+    offsets : array of int
+        Position of the first literal of each clause.
+    lengths : array of int
+        Number of literals in each clause.
+    max_variable : int, optional
+        Highest variable index. Derived from the literals if omitted.
+    index : tuple of array, optional
+        The `occurrences`, `occurrence_offsets` and `order` of a
+        previously indexed database. Built from the clauses if omitted.
+    """
+    def __init__(self, literals, offsets, lengths, max_variable=None,
+                 index=None):
+        self.literals = literals
+        self.offsets = offsets
+        self.lengths = lengths
+
+        if max_variable is None:
+            max_variable = max(max(literals, default=0),
+                               -min(literals, default=0))
+
+        self.max_variable = max_variable
+
+        # Modification time and size of the file the clauses came from.
+        self.source = (0, 0)
+
+        if index is None:
+            self.occurrences = array('i')
+            self.occurrence_offsets = array('i')
+            self.order = array('i')
+            self._index_occurrences()
+        else:
+            self.occurrences, self.occurrence_offsets, self.order = index
+
+    @classmethod
+    def from_clauses(cls, clauses):
+        """
+        Pack an iterable of clauses into a database.
+
+        Parameters
+        ----------
+        clauses : iterable of iterable of int
+            The clauses. A clause should not repeat a literal.
+
+        Returns
+        -------
+        ClauseDatabase
+        """
+        if isinstance(clauses, ClauseDatabase):
+            return clauses
+
+        literals = array('i')
+        offsets = array('i')
+        lengths = array('i')
+
+        for clause in clauses:
+            offsets.append(len(literals))
+            literals.extend(clause)
+            lengths.append(len(literals) - offsets[-1])
+
+        return cls(literals, offsets, lengths)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory map a database written by `save`.
+
+        The arrays of the returned database are read-only views on the
+        mapped file.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        ClauseDatabase
+
+        Raises
+        ------
+        ValueError
+            If the file is not a database written on this platform.
+        """
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a clause database")
+
+        magic, itemsize, mtime, size, max_variable, *counts = \
+            HEADER.unpack_from(buffer)
+
+        if magic != MAGIC or itemsize != array('i').itemsize \
+                or HEADER.size + itemsize * sum(counts) != len(buffer):
+            raise ValueError(f"{path} is not a clause database")
+
+        arrays = []
+        start = HEADER.size
+
+        for count in counts:
+            end = start + itemsize * count
+            arrays.append(memoryview(buffer)[start:end].cast('i'))
+            start = end
+
+        literals, offsets, lengths, *index = arrays
+        database = cls(literals, offsets, lengths, max_variable, index)
+        database.source = (mtime, size)
+
+        return database
+
+    def save(self, path):
+        """
+        Write the database and its index to a binary file.
+
+        The file is written next to its destination first and then moved
+        into place, so readers never see a partial file.
+        """
+        arrays = (self.literals, self.offsets, self.lengths,
+                  self.occurrences, self.occurrence_offsets, self.order)
+        header = HEADER.pack(MAGIC, array('i').itemsize, *self.source,
+                             self.max_variable, *map(len, arrays))
+        partial = f"{path}.{os.getpid()}"
+
+        with open(partial, 'wb') as file:
+            file.write(header)
+
+            for values in arrays:
+                file.write(values)
+
+        os.replace(partial, path)
+
+    def readonly(self):
+        """
+        Return a view of this database that can not be modified.
+
+        The view shares the arrays of this database, which makes it safe
+        to hand to several solvers.
+        """
+        arrays = [memoryview(values).toreadonly() for values in (
+            self.literals, self.offsets, self.lengths,
+            self.occurrences, self.occurrence_offsets, self.order)]
+        literals, offsets, lengths, *index = arrays
+
+        database = ClauseDatabase(literals, offsets, lengths,
+                                  self.max_variable, index)
+        database.source = self.source
+
+        return database
+
+    def with_clauses(self, clauses):
+        """
+        Return a new database with extra clauses appended.
+
+        The clauses of this database keep their indices, so the occurrence
+        index is merged instead of rebuilt. Only the extra clauses are
+        handled in Python, the existing arrays are copied in bulk and this
+        database is left untouched.
+
+        Parameters
+        ----------
+        clauses : iterable of iterable of int
+
+        Returns
+        -------
+        ClauseDatabase
+        """
+        extra = ClauseDatabase.from_clauses(clauses)
+
+        literals = array('i')
+        _extend(literals, self.literals)
+        _extend(literals, extra.literals)
+
+        offsets = array('i')
+        _extend(offsets, self.offsets)
+        offsets.extend(map(add, extra.offsets, repeat(len(self.literals))))
+
+        lengths = array('i')
+        _extend(lengths, self.lengths)
+        _extend(lengths, extra.lengths)
+
+        max_variable = self.max_variable
+
+        if extra.max_variable > max_variable:
+            # The occurrence index is laid out by variable, so a new
+            # variable shifts all of it.
+            return ClauseDatabase(literals, offsets, lengths)
+
+        base = self.occurrence_offsets
+        shift = len(self)
+
+        occurrences = array('i')
+        occurrence_offsets = array('i')
+        order = array('i')
+        _extend(order, self.order)
+
+        end = 0
+        added = 0
+
+        for literal in sorted(extra.order):
+            key = literal + max_variable
+
+            if base[key] == base[key + 1]:
+                order.append(literal)
+
+            # The extra clauses go behind the existing occurrences.
+            _extend(occurrences, self.occurrences[end:base[key + 1]])
+            occurrences.extend(idx + shift
+                               for idx in extra.occurrences_of(literal))
+            occurrence_offsets.extend(map(
+                add, base[len(occurrence_offsets):key + 1], repeat(added)))
+
+            added += len(extra.occurrences_of(literal))
+            end = base[key + 1]
+
+        _extend(occurrences, self.occurrences[end:])
+        occurrence_offsets.extend(map(
+            add, base[len(occurrence_offsets):], repeat(added)))
+
+        # Literals new to this database appear in the order of the extra
+        # clauses.
+        new = set(order[len(self.order):])
+        order[len(self.order):] = array(
+            'i', (literal for literal in extra.order if literal in new))
+
+        return ClauseDatabase(literals, offsets, lengths, max_variable,
+                              (occurrences, occurrence_offsets, order))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, idx):
+        """
+        Return the literals of a clause without copying them.
+        """
+        start = self.offsets[idx]
+
+        return memoryview(self.literals)[start:start + self.lengths[idx]]
+
+    def __iter__(self):
+        for idx in range(len(self.offsets)):
+            yield self[idx]
+
+    def _index_occurrences(self):
+        """
+        Build the compressed index from literals to the clauses that
+        contain them, and the order in which literals first appear.
+        """
+        max_variable = self.max_variable
+        literals = self.literals
+
+        self.order = array('i', dict.fromkeys(literals))
+
+        counts = array('i', bytes(4 * (2 * max_variable + 2)))
+
+        for literal, count in Counter(literals).items():
+            counts[literal + max_variable] = count
+
+        offsets = array('i', [0])
+        offsets.extend(accumulate(counts[:-1]))
+
+        # A stable sort of the literal positions groups the occurrences
+        # by literal, with the clauses in increasing order.
+        clause_of = array('i', chain.from_iterable(
+            map(repeat, range(len(self.lengths)), self.lengths)))
+        positions = sorted(range(len(literals)), key=literals.__getitem__)
+
+        self.occurrences = array('i', map(clause_of.__getitem__, positions))
+        self.occurrence_offsets = offsets
+
+    def occurrences_of(self, literal):
+        """
+        Return the indices of the clauses that contain a literal.
+        """
+        idx = literal + self.max_variable
+
+        return memoryview(self.occurrences)[
+            self.occurrence_offsets[idx]:self.occurrence_offsets[idx + 1]]
+
+    def variables(self):
+        """
+        Return the set of variables that occur in the clauses.
+        """
+        return {abs(literal) for literal in self.order}
+
+    def to_clauses(self):
+        """
+        Unpack the database into a list of sets.
+        """
+        return [set(clause) for clause in self]
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes used by the arrays of the database.
+        """
+        arrays = (self.literals, self.offsets, self.lengths,
+                  self.occurrences, self.occurrence_offsets, self.order)
+
+        return sum(len(values) * values.itemsize for values in arrays)
@@ -0,0 +1,157 @@
+"""
+Race several solvers on one problem.
+
+Every configured strategy runs in its own process with its own seed. The
+first definitive answer wins: a satisfying assignment from any solver, or
+unsatisfiability from a complete solver. The other processes are then
+terminated.
+"""
+import os
+import sys
+import time
+import queue
+import random
+
+from multiprocessing import Process, Queue
+
+from bitset import BitEvaluator
+from solver import select_solver, write_assignment
+from sudoku import load_database
+
+# DPLL with random splits, WalkSAT and CDCL with VSIDS.
+DEFAULT_PORTFOLIO = [2, 3, 6]
+
+# Strategies that can not prove a problem unsatisfiable.
+INCOMPLETE = {3, 11, 12, 13}
+
+
+def satisfies(clauses, assignment):
+    """
+    Check whether an assignment satisfies every clause.
+    """
+    return BitEvaluator(clauses).satisfies(assignment)
+
+
+def _race(index, cnf, strategy, seed, answers):
+    """
+    Solve a problem in a portfolio process and report the answer.
+
+    The answer is True or False if it is definitive and None otherwise.
+    """
+    sys.stdout = open(os.devnull, 'w')
+    random.seed(seed)
+
+    try:
+        solver = select_solver(load_database(cnf), strategy, silent=True)
+        satisfied = solver.solve()
+        assignment = solver.assignment
+
+        if satisfied and not satisfies(load_database(cnf), assignment):
+            satisfied = None
+        elif not satisfied and strategy in INCOMPLETE:
+            satisfied = None
+    except Exception:
+        satisfied = None
+
+    if satisfied:
+        answers.put((index, True, sorted(assignment.items())))
+    else:
+        answers.put((index, satisfied, []))
+
+
+def run_portfolio(cnf, strategies=None, output=True, silent=False,
+                  timeout=None, seed=0):
+    """
+    Run several strategies in parallel processes and keep the first
+    definitive answer.
+
+    Parameters
+    ----------
+    cnf : str
+        Path to a DIMACS file.
+    strategies : list of int, optional
+        The strategies to race, see `solver.run`. A strategy can be given
+        more than once to race it with different seeds.
+    output : bool, optional
+        Write the winning assignment to the `.out` file of the problem.
+    silent : bool, optional
+        Do not print the outcome of the race.
+    timeout : float, optional
+        Seconds after which the race is abandoned.
+    seed : int, optional
+        Seed from which the seed of every process is derived.
+
+    Returns
+    -------
+    bool or None
+        Whether the problem is satisfiable, or None if no solver gave a
+        definitive answer.
+    dict
+        The winning assignment.
+    """
+    def print_(string):
+        if not silent:
+            print(string)
+
+    if strategies is None:
+        strategies = DEFAULT_PORTFOLIO
+
+    # Load once here, so that the processes all find the problem cached.
+    load_database(cnf)
+
+    answers = Queue()
+    processes = [Process(target=_race, daemon=True,
+                         args=(index, cnf, strategy, f"{seed}:{index}",
+                               answers))
+                 for index, strategy in enumerate(strategies)]
+
+    start = time.perf_counter()
+
+    for process in processes:
+        process.start()
+
+    winner = None
+    pending = len(processes)
+
+    try:
+        while pending > 0 and winner is None:
+            if timeout is not None and time.perf_counter() - start > timeout:
+                break
+
+            try:
+                index, satisfied, assignment = answers.get(timeout=0.1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) \
+                        and answers.empty():
+                    # The remaining processes died without an answer.
+                    break
+
+                continue
+
+            pending -= 1
+
+            if satisfied is not None:
+                winner = (index, satisfied, dict(assignment))
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        for process in processes:
+            process.join()
+
+    elapsed = time.perf_counter() - start
+
+    if winner is None:
+        print_(f"No definitive answer after {elapsed:.2f}s")
+        return None, {}
+
+    index, satisfied, assignment = winner
+    print_(f"Strategy {strategies[index]} (process {index}) won after "
+           f"{elapsed:.2f}s")
+    print_("Satisfied" if satisfied else "Unsatisfied")
+
+    if output:
+        write_assignment(cnf, satisfied, assignment)
+
+    return satisfied, assignment
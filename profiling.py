@@ -0,0 +1,273 @@
+"""
+Measure what a solver spends its time on.
+"""
+import json
+import time
+import random
+
+
+class Statistics():
+    """
+    Counters and timings of a solver.
+
+    The counters are kept on the solver itself, where the search loops
+    can increment them cheaply, and are copied into a `Statistics` object
+    when it is needed. Clause visits are only counted by solvers whose
+    `count_clause_visits` is set, because they are counted in the
+    innermost loops.
+
+    Parameters
+    ----------
+    values
+        Initial values of the counters and timings.
+    """
+    COUNTERS = ['decisions', 'propagations', 'conflicts', 'backtracks',
+                'splits', 'clause_visits', 'total_flips', 'restarts']
+    TIMINGS = ['parse_time', 'setup_time', 'search_time']
+
+    def __init__(self, **values):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+
+        for name in self.TIMINGS:
+            setattr(self, name, 0.0)
+
+        for name, value in values.items():
+            if name not in self.COUNTERS and name not in self.TIMINGS:
+                raise ValueError(f"Unknown statistic '{name}'.")
+
+            setattr(self, name, value)
+
+    @classmethod
+    def of(cls, solver, parse_time=0.0):
+        """
+        Collect the statistics of a solver.
+
+        Parameters
+        ----------
+        solver : Solver
+        parse_time : float, optional
+            Seconds spent reading the clauses, which the solver does not
+            know about.
+
+        Returns
+        -------
+        Statistics
+        """
+        return cls(decisions=solver.decisions,
+                   propagations=solver.propagations,
+                   conflicts=solver.conflicts,
+                   backtracks=solver.backtracks,
+                   splits=solver.splits,
+                   clause_visits=solver.clause_visits,
+                   total_flips=getattr(solver, 'total_flips', 0),
+                   restarts=getattr(solver, 'restarts', 0),
+                   parse_time=parse_time,
+                   setup_time=solver.setup_time,
+                   search_time=solver.search_time)
+
+    @property
+    def flips_per_second(self):
+        """
+        Number of flips per second of search.
+        """
+        if self.search_time == 0:
+            return 0.0
+
+        return self.total_flips / self.search_time
+
+    @property
+    def total_time(self):
+        """
+        Seconds spent parsing, setting up and searching.
+        """
+        return self.parse_time + self.setup_time + self.search_time
+
+    def as_dict(self):
+        """
+        Return the statistics as a dictionary of plain numbers.
+        """
+        values = {name: getattr(self, name)
+                  for name in self.COUNTERS + self.TIMINGS}
+        values['flips_per_second'] = self.flips_per_second
+        values['total_time'] = self.total_time
+
+        return values
+
+    def to_json(self, **kwargs):
+        """
+        Encode the statistics as JSON, see `as_dict`.
+        """
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def write(self, path):
+        """
+        Write the statistics to a JSON file.
+        """
+        with open(path, 'w') as file:
+            file.write(self.to_json(indent=2))
+            file.write("\n")
+
+
+class Tracer():
+    """
+    Receive the events of a search.
+
+    Subclasses override the events they are interested in and are
+    registered by setting the `tracer` of a solver. The events of a phase
+    of the search are sent when that phase is over, so the time between
+    two events is the time spent in the phase of the second.
+    """
+    def on_propagate(self, solver, literals):
+        """
+        Unit propagation assigned `literals`, in the order of the trail.
+        """
+
+    def on_decision(self, solver, literal):
+        """
+        The split heuristic decided to make `literal` true.
+        """
+
+    def on_conflict(self, solver, clause):
+        """
+        The conflict on the literals of `clause` has been handled.
+        """
+
+    def on_restart(self, solver):
+        """
+        A local search started a new try.
+        """
+
+    def on_flip(self, solver, variable):
+        """
+        A local search picked and flipped `variable`.
+        """
+
+
+class PhaseProfiler(Tracer):
+    """
+    Build a histogram of the time spent in each phase of a search.
+
+    Durations are put in buckets by powers of two of microseconds. In
+    sampling mode only about one in `sample` phases is timed, so the
+    clock is read twice per `sample` events. The gaps between samples are
+    random, because phases alternate in regular patterns that a fixed
+    gap would only ever sample one of. The gaps come from a generator of
+    their own, which leaves the random choices of the solver unchanged.
+
+    Parameters
+    ----------
+    sample : int, optional
+        Time about one in this many phases.
+    """
+    PHASES = ['propagate', 'decision', 'conflict', 'restart', 'flip']
+
+    def __init__(self, sample=1):
+        if sample < 1:
+            raise ValueError("The sample interval must be at least 1.")
+
+        self.sample = sample
+        self.events = 0
+        self.next_sample = 0
+        self.random = random.Random(0)
+        self.start = time.perf_counter()
+
+        self.counts = {phase: 0 for phase in self.PHASES}
+        self.timed = {phase: 0 for phase in self.PHASES}
+        self.times = {phase: 0.0 for phase in self.PHASES}
+        self.histograms = {phase: {} for phase in self.PHASES}
+
+    def _event(self, phase):
+        self.counts[phase] += 1
+
+        if self.start is not None:
+            duration = time.perf_counter() - self.start
+            bucket = int(duration * 1e6).bit_length()
+            histogram = self.histograms[phase]
+
+            self.timed[phase] += 1
+            self.times[phase] += duration
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+            self.start = None
+
+        self.events += 1
+
+        if self.events >= self.next_sample:
+            self.next_sample = self.events \
+                + self.random.randint(1, 2 * self.sample - 1)
+            self.start = time.perf_counter()
+
+    def on_propagate(self, solver, literals):
+        self._event('propagate')
+
+    def on_decision(self, solver, literal):
+        self._event('decision')
+
+    def on_conflict(self, solver, clause):
+        self._event('conflict')
+
+    def on_restart(self, solver):
+        self._event('restart')
+
+    def on_flip(self, solver, variable):
+        self._event('flip')
+
+    def estimated_time(self, phase):
+        """
+        Estimate the total time of a phase from the timed samples.
+        """
+        if self.timed[phase] == 0:
+            return 0.0
+
+        return self.times[phase] / self.timed[phase] * self.counts[phase]
+
+    def summary(self):
+        """
+        Describe the time spent in each phase and its histogram.
+
+        Returns
+        -------
+        str
+        """
+        lines = [f"Timed {sum(self.timed.values())} of {self.events} "
+                 f"phases", ""]
+        lines.append(f"{'phase':<10} {'count':>10} {'timed':>10} "
+                     f"{'mean (us)':>10} {'total (s)':>10}")
+
+        for phase in self.PHASES:
+            if self.counts[phase] == 0:
+                continue
+
+            mean = 0.0
+
+            if self.timed[phase] > 0:
+                mean = self.times[phase] / self.timed[phase] * 1e6
+
+            lines.append(f"{phase:<10} {self.counts[phase]:>10} "
+                         f"{self.timed[phase]:>10} {mean:>10.1f} "
+                         f"{self.estimated_time(phase):>10.4f}")
+
+        for phase in self.PHASES:
+            histogram = self.histograms[phase]
+
+            if not histogram:
+                continue
+
+            lines.extend(["", f"{phase} (us)"])
+            largest = max(histogram.values())
+
+            for bucket in range(min(histogram), max(histogram) + 1):
+                count = histogram.get(bucket, 0)
+                low = 0 if bucket == 0 else 1 << (bucket - 1)
+                bar = '#' * -(-40 * count // largest)
+                lines.append(f"{low:>10} - {1 << bucket:<10} {count:>10} "
+                             f"{bar}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the summary to a file.
+        """
+        with open(path, 'w') as file:
+            file.write(self.summary())
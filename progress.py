@@ -0,0 +1,76 @@
+"""
+Report the progress of a long search on the terminal.
+"""
+import sys
+import threading
+
+
+class ProgressReporter():
+    """
+    Render a progress line from a background thread.
+
+    The search itself does not report anything: the thread wakes up at
+    most `rate` times per second and calls `render`, which should only
+    read counters that the search keeps up to date anyway. The line is
+    rewritten in place and finished with a newline when the reporter
+    stops.
+
+    Parameters
+    ----------
+    render : callable
+        Returns the current progress line.
+    rate : float, optional
+        Maximum number of updates per second.
+    stream : file, optional
+        Where the progress is written, by default standard output.
+    """
+    def __init__(self, render, rate=10, stream=None):
+        if rate <= 0:
+            raise ValueError("The update rate must be positive.")
+
+        self.render = render
+        self.interval = 1 / rate
+        self.stream = stream
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Start reporting.
+        """
+        if self.stream is None:
+            self.stream = sys.stdout
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop reporting after writing the final progress.
+        """
+        if self.thread is None:
+            return
+
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+        self._write()
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        self.stream.write(f"\r{self.render()}")
+        self.stream.flush()
@@ -1,15 +1,20 @@
 import os
 import argparse
-import time
 import json
 import numpy as np
 
 from tqdm import tqdm
 
-from solver import run
+from batch import RecordWriter, cnf_problems, read_records, run_batch
 
 DIFFICULTY = ['simple', 'easy', 'intermediate', 'expert']
 
+# Measurements of `batch.measure` that are kept for every file.
+TIMINGS = {name: name for name in ['parse_time', 'setup_time',
+                                   'search_time']}
+SEARCH_STATISTICS = dict(TIMINGS, **{name: name for name in [
+    'decisions', 'propagations', 'conflicts', 'backtracks']})
+
 
 def wrapper(func, *args, **kwargs):
     def wrapped():
@@ -18,123 +23,159 @@ def wrapper(func, *args, **kwargs):
     return wrapped
 
 
-def run_exp_1(strategy=1):
+def collect(results, idx, runs, measurements):
+    """
+    Add the mean of some measurements over the repeats of a file to the
+    results of a difficulty. Files whose repeats all timed out are only
+    listed under 'timeouts'.
+    """
+    runs = [run for run in runs if not run['timeout']]
+
+    if len(runs) == 0:
+        results['timeouts'].append(idx)
+        return
+
+    results['idx'].append(idx)
+
+    for key, measurement in measurements.items():
+        results[key].append(np.mean([run[measurement] for run in runs]))
+
+
+def run_batch_exp(strategy, measurements, repeats=1, processes=None,
+                  timeout=None, seed=0, records=None):
+    """
+    Solve every file of each difficulty in a pool of processes.
+
+    The runs of every file are appended to a JSON-lines file of records
+    as soon as they finish. Files that already have a record there are
+    not solved again if the strategy, the number of repeats, the timeout
+    and the seed match, so an interrupted sweep continues where it
+    stopped. The seeds of the runs only depend on `seed` and the files,
+    so a resumed sweep gives the same results as an uninterrupted one.
+
+    Parameters
+    ----------
+    strategy : int
+    measurements : dict
+        Maps the keys of the results to the measurements of `batch.measure`.
+    records : str, optional
+        Path of the records, by default `experiment_<strategy>.jsonl`.
+
+    Returns
+    -------
+    dict
+        The results of each difficulty.
+    """
+    if records is None:
+        records = f"experiment_{strategy}.jsonl"
+
+    done = {(record['difficulty'], record['file']): record['runs']
+            for record in read_records(records)
+            if record['strategy'] == strategy
+            and record['repeats'] == repeats
+            and record.get('timeout') == timeout
+            and record.get('seed') == seed}
     results = {}
-    for difficulty in DIFFICULTY:
-        print(f"Difficulty: {difficulty}")
-        results[difficulty] = {
-            'idx': [],
-            'splits': [],
-            'runtime': [],
-        }
-
-        files = sorted(os.listdir(difficulty))
-
-        for idx, file in enumerate(tqdm(files)):
-            path = os.path.join(difficulty, file)
-
-            start = time.time()
-            solver = run(path, strategy=strategy, output=False, silent=True)
-            end = time.time()
 
-            results[difficulty]['idx'].append(idx)
-            results[difficulty]['splits'].append(solver.splits)
-            results[difficulty]['runtime'].append(end - start)
-
-        results[difficulty]['mean_splits'] = np.mean(
-            results[difficulty]['splits'])
-        results[difficulty]['mean_runtime'] = np.mean(
-            results[difficulty]['runtime'])
-
-    with open(f"experiment_{strategy}.json", 'w') as file:
-        json.dump(results, file)
+    with RecordWriter(records) as writer:
+        for difficulty in DIFFICULTY:
+            files = sorted(os.listdir(difficulty))
+            todo = [file for file in files if (difficulty, file) not in done]
+            print(f"Difficulty: {difficulty} "
+                  f"({len(files) - len(todo)}/{len(files)} done)")
 
+            problems = cnf_problems(
+                [os.path.join(difficulty, file) for file in todo])
+            batch = run_batch(problems, strategy, repeats, processes,
+                              timeout=timeout, seed=seed)
 
-def run_exp_2(strategy=2, repeats=10):
-    results = {}
-    for difficulty in DIFFICULTY:
-        print(f"Difficulty: {difficulty}")
-        results[difficulty] = {
-            'idx': [],
-            'splits': [],
-            'runtime': [],
-        }
+            for file, runs in zip(todo, tqdm(batch, total=len(problems))):
+                writer.write({'difficulty': difficulty, 'file': file,
+                              'strategy': strategy, 'repeats': repeats,
+                              'timeout': timeout, 'seed': seed,
+                              'runs': runs})
+                done[(difficulty, file)] = runs
 
-        files = sorted(os.listdir(difficulty))
+            results[difficulty] = {'idx': [], 'timeouts': []}
+            results[difficulty].update({key: [] for key in measurements})
 
-        for idx, file in enumerate(tqdm(files)):
-            path = os.path.join(difficulty, file)
+            for idx, file in enumerate(files):
+                collect(results[difficulty], idx, done[(difficulty, file)],
+                        measurements)
 
-            runtimes = []
-            splits = []
+    return results
 
-            for i in range(repeats):
-                start = time.time()
-                solver = run(path, strategy=strategy, output=False,
-                             silent=True)
-                end = time.time()
 
-                runtimes.append(end - start)
-                splits.append(solver.splits)
+def run_exp_1(strategy=1, name=None, **kwargs):
+    if name is None:
+        name = strategy
 
-            results[difficulty]['idx'].append(idx)
-            results[difficulty]['splits'].append(np.mean(splits))
-            results[difficulty]['runtime'].append(np.mean(runtimes))
+    results = run_batch_exp(strategy, {
+        'splits': 'splits',
+        'runtime': 'runtime',
+        'memory': 'memory',
+        **SEARCH_STATISTICS,
+    }, records=f"experiment_{name}.jsonl", **kwargs)
 
+    for difficulty in DIFFICULTY:
         results[difficulty]['mean_splits'] = np.mean(
             results[difficulty]['splits'])
         results[difficulty]['mean_runtime'] = np.mean(
             results[difficulty]['runtime'])
+        results[difficulty]['mean_memory'] = np.mean(
+            results[difficulty]['memory'])
 
-    with open(f"experiment_{strategy}.json", 'w') as file:
+    with open(f"experiment_{name}.json", 'w') as file:
         json.dump(results, file)
 
 
-def run_exp_3(strategy=3, repeats=1):
-    results = {}
-
-    try:
-        for difficulty in DIFFICULTY:
-            print(f"Difficulty: {difficulty}")
-            results[difficulty] = {
-                'idx': [],
-                'flips': [],
-                'restarts': [],
-                'runtime': [],
-            }
-
-            files = sorted(os.listdir(difficulty))
+def run_exp_2(strategy=2, repeats=10, name=None, **kwargs):
+    if name is None:
+        name = strategy
 
-            for idx, file in enumerate(tqdm(files)):
-                path = os.path.join(difficulty, file)
+    results = run_batch_exp(strategy, {
+        'splits': 'splits',
+        'runtime': 'runtime',
+        'memory': 'memory',
+        **SEARCH_STATISTICS,
+    }, repeats, records=f"experiment_{name}.jsonl", **kwargs)
 
-                runtimes = []
-                flips = []
-                restarts = []
-
-                for i in range(repeats):
-                    start = time.time()
-                    solver = run(path, strategy=strategy, output=False,
-                                 silent=True)
-                    end = time.time()
+    for difficulty in DIFFICULTY:
+        results[difficulty]['mean_splits'] = np.mean(
+            results[difficulty]['splits'])
+        results[difficulty]['mean_runtime'] = np.mean(
+            results[difficulty]['runtime'])
+        results[difficulty]['mean_memory'] = np.mean(
+            results[difficulty]['memory'])
 
-                    runtimes.append(end - start)
-                    flips.append(solver.flips)
-                    restarts.append(solver.restarts)
+    with open(f"experiment_{name}.json", 'w') as file:
+        json.dump(results, file)
 
-                results[difficulty]['idx'].append(idx)
-                results[difficulty]['flips'].append(np.mean(flips))
-                results[difficulty]['restarts'].append(np.mean(restarts))
-                results[difficulty]['runtime'].append(np.mean(runtimes))
 
-            results[difficulty]['mean_splits'] = np.mean(
-                results[difficulty]['flips'])
-            results[difficulty]['mean_runtime'] = np.mean(
-                results[difficulty]['runtime'])
-    except KeyboardInterrupt:
-        pass
+def run_exp_3(strategy=3, repeats=1, name=5, **kwargs):
+    # Experiments 3 and 4 hold earlier WalkSAT runs, so the results go to
+    # experiment 5 by default.
+    results = run_batch_exp(strategy, {
+        'flips': 'flips',
+        'restarts': 'restarts',
+        'runtime': 'runtime',
+        'memory': 'memory',
+        'flips_per_second': 'flips_per_second',
+        'total_flips': 'total_flips',
+        **TIMINGS,
+    }, repeats, records=f"experiment_{name}.jsonl", **kwargs)
+
+    for difficulty in results:
+        results[difficulty]['mean_splits'] = np.mean(
+            results[difficulty]['flips'])
+        results[difficulty]['mean_flips_per_second'] = np.mean(
+            results[difficulty]['flips_per_second'])
+        results[difficulty]['mean_runtime'] = np.mean(
+            results[difficulty]['runtime'])
+        results[difficulty]['mean_memory'] = np.mean(
+            results[difficulty]['memory'])
 
-    with open(f"experiment_5.json", 'w') as file:
+    with open(f"experiment_{name}.json", 'w') as file:
         json.dump(results, file)
 
 
@@ -142,14 +183,30 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the report experiments")
     parser.add_argument(metavar='E', dest='experiment', type=int,
                         help="The experiment to run.")
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help="Number of worker processes, by default the "
+                             "number of cores.")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Seconds after which a file is abandoned.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the random number generators.")
+    parser.add_argument('--name', default=None,
+                        help="Write the results to experiment_<name>.json "
+                             "and its records to experiment_<name>.jsonl.")
     args = parser.parse_args()
 
+    options = {'processes': args.processes, 'timeout': args.timeout,
+               'seed': args.seed}
+
+    if args.name is not None:
+        options['name'] = args.name
+
     if args.experiment is 1:
         print("Naive DPLL")
-        run_exp_1(args.experiment)
+        run_exp_1(args.experiment, **options)
     elif args.experiment is 2:
         print("DPLL with random split")
-        run_exp_2(args.experiment)
+        run_exp_2(args.experiment, **options)
     elif args.experiment is 3:
         print("WalkSAT")
-        run_exp_3(args.experiment)
+        run_exp_3(args.experiment, **options)
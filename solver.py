@@ -1,49 +1,251 @@
-import sys
+import os
+import time
 import random
 import argparse
+import tempfile
 
+from array import array
+from contextlib import nullcontext
+
+from database import ClauseDatabase
+from profiling import Statistics, PhaseProfiler
+from progress import ProgressReporter
+from splits import Heuristic, VSIDS, JeroslowWang, DLIS, MOMs
 from splits import naive_split, random_split
 from sudoku import load_all_games, load_example, draw_assignment, check_sudoku
-from sudoku import load_dimacs
+from sudoku import load_database, load_rules, load_givens, read_dimacs
+
+# Limit of a budget that is not set.
+BUDGET_UNLIMITED = float('inf')
 
-RC = 0  # 'Remove Clause'
-RL = 1  # 'Remove Literal'
-AA = 2  # 'Add Assignment'
-CC = 3  # 'Clean Containment'
+# Number of budget checks between two readings of the clock.
+BUDGET_INTERVAL = 256
+
+# Ways in which WalkSAT picks the variable to flip.
+WALK_METHODS = ['walksat', 'probsat', 'novelty+']
 
 
 class Solver():
+    """
+    Davis-Putnam solver.
+
+    The state of the search is a trail of assigned literals. Each split
+    opens a new decision level that starts at the current end of the
+    trail, so backtracking to a level only truncates the trail and
+    unassigns the variables on it; the clauses themselves are never
+    modified during the search.
+
+    The clauses are kept in a flat `ClauseDatabase` and the value of
+    each variable in a list indexed by the variable.
+    """
     def __init__(self, clauses, split=naive_split):
-        self.clauses = self._create_clauses(*clauses)
-        self.change_log = [[]]
-        self.assignment = {}
-        self.containment = {}
+        self.clauses = ClauseDatabase.from_clauses(clauses)
+        self.values = [None] * (self.clauses.max_variable + 1)
+
+        self.trail = []
+        self.trail_lim = []
+        self.queue_head = 0
+        self.num_variables = 0
+        self.propagations = 0
+        self.decisions = 0
+        self.conflicts = 0
+        self.backtracks = 0
 
         self.split = split
         self.splits = 0
 
+        # Receives the events of the search, see `profiling.Tracer`.
+        self.tracer = None
+
+        # Maximum number of progress updates per second of a local
+        # search, none at all when silent.
+        self.silent = False
+        self.report_rate = 10
+
+        # Clause visits are counted in the innermost loops, so only on
+        # request.
+        self.count_clause_visits = False
+        self.clause_visits = 0
+
+        self.setup_time = 0.0
+        self.search_time = 0.0
+
+        # Budgets of a single call to `solve`, None for no limit. The
+        # name of the budget that ran out is kept in `exhausted`.
+        self.time_budget = None
+        self.decision_budget = None
+        self.propagation_budget = None
+        self.flip_budget = None
+        self.exhausted = None
+
+        # Only stateful heuristics are notified of the search.
+        self.heuristic = split if isinstance(split, Heuristic) else None
+
+    @property
+    def assignment(self):
+        """
+        Dictionary mapping each assigned variable to its value.
+        """
+        return {variable: value for variable, value in enumerate(self.values)
+                if value is not None}
+
     def solve(self):
         """
         Run the solver.
 
+        Returns
+        -------
+        bool or None
+            True if a solution was found, False if there is none and None
+            if a budget ran out first.
+        """
+        self._start_budget()
+
+        start = time.perf_counter()
+        prepared = self._prepare()
+        self.setup_time += time.perf_counter() - start
+
+        if not prepared:
+            return False
+
+        start = time.perf_counter()
+
+        try:
+            return self._dpll()
+        finally:
+            self.search_time += time.perf_counter() - start
+
+    def statistics(self, parse_time=0.0):
+        """
+        Collect the counters and timings of the solver.
+
+        Parameters
+        ----------
+        parse_time : float, optional
+            Seconds spent reading the clauses.
+
+        Returns
+        -------
+        Statistics
+        """
+        return Statistics.of(self, parse_time)
+
+    def set_budget(self, seconds=None, decisions=None, propagations=None,
+                   flips=None):
+        """
+        Bound every following call to `solve`.
+
+        Parameters
+        ----------
+        seconds : float, optional
+            Wall-clock time.
+        decisions : int, optional
+            Number of splits that are tried.
+        propagations : int, optional
+            Number of propagated literals.
+        flips : int, optional
+            Number of flips of a local search, over all its tries.
+        """
+        self.time_budget = seconds
+        self.decision_budget = decisions
+        self.propagation_budget = propagations
+        self.flip_budget = flips
+
+    def _start_budget(self):
+        """
+        Turn the budgets into limits on the counters of the solver.
+
+        Budgets that are not set become limits that are never reached, so
+        the search loops can compare against them unconditionally.
+        """
+        def limit(start, budget):
+            return BUDGET_UNLIMITED if budget is None else start + budget
+
+        self.exhausted = None
+        self.deadline = limit(time.perf_counter(), self.time_budget)
+        self.decision_limit = limit(self.decisions, self.decision_budget)
+        self.propagation_limit = limit(self.propagations,
+                                       self.propagation_budget)
+        self.flip_limit = limit(getattr(self, 'total_flips', 0),
+                                self.flip_budget)
+
+    def _out_of_budget(self, checks):
+        """
+        Check the budgets of a complete search, reading the clock only
+        once every `BUDGET_INTERVAL` checks.
+        """
+        if self.decisions >= self.decision_limit:
+            self.exhausted = 'decisions'
+        elif self.propagations >= self.propagation_limit:
+            self.exhausted = 'propagations'
+        elif checks % BUDGET_INTERVAL == 0 \
+                and time.perf_counter() >= self.deadline:
+            self.exhausted = 'time'
+
+        return self.exhausted is not None
+
+    def _reporter(self):
+        """
+        Create the context in which a local search reports its progress,
+        see `_progress`.
+        """
+        if self.silent or not self.report_rate:
+            return nullcontext()
+
+        return ProgressReporter(self._progress, self.report_rate)
+
+    def _out_of_flips(self, flip):
+        """
+        Check the budgets of a local search, reading the clock only once
+        every `BUDGET_INTERVAL` flips.
+        """
+        if self.total_flips >= self.flip_limit:
+            self.exhausted = 'flips'
+        elif flip % BUDGET_INTERVAL == 0 \
+                and time.perf_counter() >= self.deadline:
+            self.exhausted = 'time'
+
+        return self.exhausted is not None
+
+    def _prepare(self):
+        """
+        Index the clauses and queue the literals of unit clauses.
+
         Returns
         -------
         bool
-            True if a solution was found, False otherwise.
+            False if the clauses are trivially unsatisfiable, True
+            otherwise.
         """
-        self.containment = self._get_containment()
         self._remove_tautologies()
+        self.num_variables = len(self.clauses.variables())
+
+        if self.heuristic is not None:
+            self.heuristic.setup(self)
 
-        return self._dpll()
+        return self._index_clauses()
 
-    def _create_clauses(self, *clauses):
+    def _index_clauses(self):
         """
-        Convert a list of clauses to a dictionary where each entry's key
-        is the clause's index.
+        Queue the literals of unit clauses.
+
+        Returns
+        -------
+        bool
+            False if the clauses are trivially unsatisfiable, True
+            otherwise.
         """
-        clauses = {idx: clause for idx, clause in enumerate(clauses)}
+        literals = self.clauses.literals
+        offsets = self.clauses.offsets
 
-        return clauses
+        for idx, length in enumerate(self.clauses.lengths):
+            if length == 0:
+                return False
+            elif length == 1:
+                if not self._enqueue(literals[offsets[idx]]):
+                    return False
+
+        return True
 
     def _add_assignment(self, literal, value):
         """
@@ -53,17 +255,15 @@ class Solver():
             literal = abs(literal)
             value = not value
 
-        self.assignment[literal] = value
-
-        self.change_log[-1].append((AA, literal, literal))
+        self.values[literal] = value
 
     def _get_assignment(self, literal):
         """
         Retrieve the assignment of a literal.
         """
-        try:
-            value = self.assignment[abs(literal)]
-        except KeyError:
+        value = self.values[abs(literal)]
+
+        if value is None:
             return False
 
         if literal < 0:
@@ -71,359 +271,1289 @@ class Solver():
         else:
             return value
 
-    def _delete_clause(self, idx):
+    def _enqueue(self, literal, reason=None):
+        """
+        Assign a literal the value True and put it on the propagation
+        queue.
+
+        Parameters
+        ----------
+        literal : int
+            The literal to make True.
+        reason : int, optional
+            Index of the clause that implied the literal, or None for
+            decisions and unit clauses.
+
+        Returns
+        -------
+        bool
+            False if the literal was already assigned False, True
+            otherwise.
+        """
+        value = self.values[abs(literal)]
+
+        if value is not None:
+            return value == (literal > 0)
+
+        self.values[abs(literal)] = literal > 0
+        self.trail.append(literal)
+
+        return True
+
+    def _propagate(self):
+        """
+        Propagate all queued assignments by checking every clause that
+        contains the negation of an assigned literal.
+
+        The propagation queue is the part of the trail that starts at
+        `queue_head`.
+
+        Returns
+        -------
+        int or None
+            Index of a clause that became unsatisfied, or None if there
+            was no conflict.
+        """
+        values = self.values
+        literals = self.clauses.literals
+        offsets = self.clauses.offsets
+        lengths = self.clauses.lengths
+        occurrences = self.clauses.occurrences
+        occurrence_offsets = self.clauses.occurrence_offsets
+        max_variable = self.clauses.max_variable
+        trail = self.trail
+        count_visits = self.count_clause_visits
+
+        while self.queue_head < len(trail):
+            false_literal = -trail[self.queue_head]
+            self.queue_head += 1
+            self.propagations += 1
+
+            occurrence = false_literal + max_variable
+            containing = occurrences[occurrence_offsets[occurrence]:
+                                     occurrence_offsets[occurrence + 1]]
+
+            if count_visits:
+                self.clause_visits += len(containing)
+
+            for idx in containing:
+                unassigned = None
+                start = offsets[idx]
+
+                for literal in literals[start:start + lengths[idx]]:
+                    value = values[abs(literal)]
+
+                    if value is None:
+                        if unassigned is not None:
+                            # At least two literals are still open.
+                            break
+
+                        unassigned = literal
+                    elif value == (literal > 0):
+                        # The clause is satisfied.
+                        break
+                else:
+                    if unassigned is None:
+                        return idx
+
+                    self._enqueue(unassigned, idx)
+
+        return None
+
+    def _backtrack(self, mark):
+        """
+        Unassign every literal on the trail from position `mark` onwards.
+        """
+        if self.heuristic is not None:
+            self.heuristic.unassign(self.trail[mark:])
+
+        for literal in self.trail[mark:]:
+            self.values[abs(literal)] = None
+
+        del self.trail[mark:]
+        self.queue_head = mark
+
+    def _backtrack_to(self, level):
+        """
+        Undo all assignments made after the given decision level.
+        """
+        if level < len(self.trail_lim):
+            self.backtracks += 1
+            self._backtrack(self.trail_lim[level])
+            del self.trail_lim[level:]
+
+    def _clause(self, idx):
+        """
+        Return the literals of a clause.
+        """
+        return self.clauses[idx]
+
+    def _remove_tautologies(self):
+        # A tautology occurs in the index of a literal and its negation.
+        tautologies = set()
+
+        for variable in self.clauses.variables():
+            tautologies.update(
+                set(self.clauses.occurrences_of(variable)).intersection(
+                    self.clauses.occurrences_of(-variable)))
+
+        if len(tautologies) > 0:
+            self.clauses = ClauseDatabase.from_clauses(
+                clause for idx, clause in enumerate(self.clauses)
+                if idx not in tautologies)
+
+    def _simplify(self):
+        """
+        Assign the literals of unit clauses and propagate them, then
+        rewrite the set of clauses without the satisfied clauses and
+        the false literals.
+
+        Returns
+        -------
+        bool
+            False if the propagation ran into a conflict, True otherwise.
+        """
+        if not self._index_clauses() or self._propagate() is not None:
+            return False
+
+        clauses = []
+
+        for clause in self.clauses:
+            if any(self._get_assignment(literal) for literal in clause):
+                continue
+
+            clauses.append([literal for literal in clause
+                            if self.values[abs(literal)] is None])
+
+        self.clauses = ClauseDatabase.from_clauses(clauses)
+
+        return True
+
+    def _dpll(self):
+        """
+        Search for a satisfying assignment.
+
+        The search is iterative: each decision level on the trail starts
+        with the first branch of a split, so the pending second branches
+        are read off the trail instead of being kept on the call stack.
+        """
+        trail = self.trail
+        trail_lim = self.trail_lim
+        tracer = self.tracer
+        checks = 0
+
+        while True:
+            head = self.queue_head
+            conflict = self._propagate()
+
+            if tracer is not None:
+                tracer.on_propagate(self, trail[head:self.queue_head])
+
+            checks += 1
+            if self._out_of_budget(checks):
+                return None
+
+            if conflict is not None:
+                self.conflicts += 1
+
+                if self.heuristic is not None:
+                    self.heuristic.conflict(self._clause(conflict))
+
+                if tracer is not None:
+                    tracer.on_conflict(self, self._clause(conflict))
+
+                if len(trail_lim) == 0:
+                    # Both branches of every split failed.
+                    return False
+
+                # Return to the level of the most recent split and try
+                # its other branch.
+                level = len(trail_lim) - 1
+                literal = trail[trail_lim[level]]
+
+                self._backtrack_to(level)
+                self.splits += 1
+
+                self._enqueue(-literal)
+                continue
+
+            if len(trail) == self.num_variables:
+                # Every variable is assigned without conflicts.
+                return True
+
+            # Select a literal to split.
+            literal, value = self.split(self)
+            self.decisions += 1
+
+            if not value:
+                literal = -literal
+
+            trail_lim.append(len(trail))
+            self._enqueue(literal)
+
+            if tracer is not None:
+                tracer.on_decision(self, literal)
+
+
+class WatchedSolver(Solver):
+    """
+    Davis-Putnam solver that finds unit clauses through two watched
+    literals per clause.
+
+    Each clause watches two of its literals that are not false, so
+    assigning a literal only visits the clauses watching its negation.
+    Like the trail itself, the watches do not have to be restored when
+    backtracking.
+
+    The watched literals are kept in the first two positions of each
+    clause, so the solver works on its own copy of the clause arena.
+    """
+    def __init__(self, clauses, split=naive_split):
+        super(WatchedSolver, self).__init__(clauses, split)
+
+        self.literals = array('i')
+        self.offsets = array('i')
+        self.lengths = array('i')
+        self.watches = []
+
+    def _index_clauses(self):
+        """
+        Let every clause watch its first two literals and queue the
+        literals of unit clauses.
+
+        Returns
+        -------
+        bool
+            False if the clauses are trivially unsatisfiable, True
+            otherwise.
+        """
+        self.literals = array('i', self.clauses.literals)
+        self.offsets = array('i', self.clauses.offsets)
+        self.lengths = array('i', self.clauses.lengths)
+
+        # A list of length 2 * max_variable + 1 can be indexed by literals
+        # directly; the negative literals wrap around to the back half.
+        self.watches = [[] for _ in range(2 * self.clauses.max_variable + 1)]
+
+        for idx, length in enumerate(self.lengths):
+            start = self.offsets[idx]
+
+            if length == 0:
+                return False
+            elif length == 1:
+                if not self._enqueue(self.literals[start]):
+                    return False
+                continue
+
+            self.watches[self.literals[start]].append(idx)
+            self.watches[self.literals[start + 1]].append(idx)
+
+        return True
+
+    def _clause(self, idx):
         """
-        Delete a clause from the set of clauses by its index.
+        Return a copy of the literals of a clause.
         """
-        clause = self.clauses[idx]
+        start = self.offsets[idx]
 
-        self.change_log[-1].append((RC, idx, clause))
-        del self.clauses[idx]
+        return self.literals[start:start + self.lengths[idx]]
 
-    def _delete_literal(self, idx, literal):
+    def _propagate(self):
         """
-        Delete a literal from a clause.
+        Propagate all queued assignments through the watched literals.
+
+        The propagation queue is the part of the trail that starts at
+        `queue_head`.
 
-        The clause is addressed by its index.
+        Returns
+        -------
+        int or None
+            Index of a clause that became unsatisfied, or None if there
+            was no conflict.
         """
-        self.clauses[idx].remove(literal)
-        self.change_log[-1].append((RL, idx, literal))
+        values = self.values
+        literals = self.literals
+        offsets = self.offsets
+        lengths = self.lengths
+        watches = self.watches
+        trail = self.trail
+        count_visits = self.count_clause_visits
+
+        while self.queue_head < len(trail):
+            false_literal = -trail[self.queue_head]
+            self.queue_head += 1
+            self.propagations += 1
+
+            watchers = watches[false_literal]
+
+            if not watchers:
+                continue
+
+            if count_visits:
+                self.clause_visits += len(watchers)
+
+            kept = 0
+            idx = 0
+
+            while idx < len(watchers):
+                clause_idx = watchers[idx]
+                idx += 1
+                start = offsets[clause_idx]
 
-    def _clean_containment(self, idx, literal):
+                # Keep the falsified watch in the second position.
+                other = literals[start]
+
+                if other == false_literal:
+                    other = literals[start + 1]
+                    literals[start] = other
+                    literals[start + 1] = false_literal
+
+                value = values[abs(other)]
+
+                if value is not None and value == (other > 0):
+                    # The clause is already satisfied by its other watch.
+                    watchers[kept] = clause_idx
+                    kept += 1
+                    continue
+
+                for position in range(start + 2,
+                                      start + lengths[clause_idx]):
+                    literal = literals[position]
+                    value = values[abs(literal)]
+
+                    if value is None or value == (literal > 0):
+                        # Move the watch to a literal that is not false.
+                        literals[start + 1] = literal
+                        literals[position] = false_literal
+                        watches[literal].append(clause_idx)
+                        break
+                else:
+                    watchers[kept] = clause_idx
+                    kept += 1
+
+                    if not self._enqueue(other, clause_idx):
+                        # Conflict; keep the remaining watchers intact.
+                        while idx < len(watchers):
+                            watchers[kept] = watchers[idx]
+                            kept += 1
+                            idx += 1
+
+                        del watchers[kept:]
+                        return clause_idx
+
+            del watchers[kept:]
+
+        return None
+
+
+class CDCLSolver(WatchedSolver):
+    """
+    Conflict-driven clause learning solver.
+
+    Every conflict is analysed down to its first unique implication
+    point. The resulting clause is minimized and learned, after which the
+    solver jumps back to the second highest decision level in it instead
+    of undoing only the most recent split. Learned clauses that are not
+    useful anymore are periodically removed from the database.
+
+    The solver can be used incrementally: `add_clauses` extends the
+    clauses and `solve` accepts assumptions, which are decided before any
+    other literal. Learned clauses only depend on the clauses, so they
+    and the watches are kept between calls.
+    """
+    def __init__(self, clauses, split=naive_split):
+        super(CDCLSolver, self).__init__(clauses, split)
+
+        self.prepared = False
+        self.unsatisfiable = False
+        self.assumptions = []
+        self.occurring = set()
+
+        self.level = [0] * len(self.values)
+        self.reason = [None] * len(self.values)
+
+        self.learned = []
+        self.lbd = {}
+        self.clause_activity = {}
+        self.clause_increment = 1.0
+        self.clause_decay = 0.999
+        self.max_learned = 0
+        self.learned_growth = 1.1
+        self.garbage = 0
+
+    def solve(self, assumptions=()):
         """
-        Make a literal not point to a certain clause anymore through
-        the containment dictionary.
+        Run the solver.
 
         Parameters
         ----------
-        idx : int
-            Index of the clause.
-        literal : int
-            Index of the literal.
+        assumptions : iterable of int, optional
+            Literals that are assumed to be true for this call only.
+
+        Returns
+        -------
+        bool or None
+            True if a solution was found, False if there is none and None
+            if a budget ran out first.
+        """
+        self._start_budget()
+
+        if not self._ready():
+            return False
+
+        self.assumptions = list(assumptions)
+        self._check_variables(self.assumptions)
+        self._backtrack_to(0)
+
+        start = time.perf_counter()
+
+        try:
+            return self._cdcl()
+        finally:
+            self.search_time += time.perf_counter() - start
+
+    def add_clauses(self, clauses):
+        """
+        Add clauses to a solver, also between calls to `solve`.
+
+        The clauses are simplified with the assignments that hold without
+        any decisions. They may only use variables that occur in the
+        initial clauses.
+
+        Parameters
+        ----------
+        clauses : iterable of iterable of int
+
+        Returns
+        -------
+        bool
+            False if the clauses became trivially unsatisfiable, True
+            otherwise.
+        """
+        if not self._ready():
+            return False
+
+        self._backtrack_to(0)
+        values = self.values
+
+        for clause in clauses:
+            clause = list(dict.fromkeys(clause))
+            self._check_variables(clause)
+
+            if any(-literal in clause for literal in clause) \
+                    or any(values[abs(literal)] == (literal > 0)
+                           for literal in clause):
+                # Tautologies and satisfied clauses never constrain.
+                continue
+
+            clause = [literal for literal in clause
+                      if values[abs(literal)] is None]
+
+            if len(clause) == 0:
+                self.unsatisfiable = True
+                return False
+            elif len(clause) == 1:
+                self._enqueue(clause[0])
+                continue
+
+            idx = len(self.offsets)
+
+            self.offsets.append(len(self.literals))
+            self.lengths.append(len(clause))
+            self.literals.extend(clause)
+
+            self.watches[clause[0]].append(idx)
+            self.watches[clause[1]].append(idx)
+
+        return True
+
+    def _ready(self):
+        """
+        Prepare the solver the first time it is used.
+
+        Returns
+        -------
+        bool
+            False if the clauses are known to be unsatisfiable, True
+            otherwise.
         """
-        self.containment[literal].remove(idx)
+        if not self.prepared:
+            start = time.perf_counter()
+            self.prepared = True
+            self.unsatisfiable = not self._prepare()
+            self.max_learned = max(1000, len(self.clauses) // 3)
+            self.occurring = self.clauses.variables()
+            self.setup_time += time.perf_counter() - start
 
-        self.change_log[-1].append((CC, idx, literal))
+        return not self.unsatisfiable
 
-    def _assign_literal(self, literal):
+    def _check_variables(self, literals):
         """
-        Simplify the set of clauses by removing references to a assigned
-        literal and its negations.
+        Make sure that literals only use variables the solver knows.
         """
-        value = self._get_assignment(literal)
+        for literal in literals:
+            if abs(literal) not in self.occurring:
+                raise ValueError(f"Variable {abs(literal)} does not occur "
+                                 "in the clauses of the solver.")
+
+    def _enqueue(self, literal, reason=None):
+        variable = abs(literal)
+        value = self.values[variable]
 
-        if -literal in self.containment:
-            not_clauses = set(self.containment[-literal])
+        if value is not None:
+            return value == (literal > 0)
 
-            for idx in not_clauses:
-                self._clean_containment(idx, -literal)
+        self.values[variable] = literal > 0
+        self.level[variable] = len(self.trail_lim)
+        self.reason[variable] = reason
+        self.trail.append(literal)
 
-                if idx not in self.clauses:
+        return True
+
+    def _analyze(self, conflict):
+        """
+        Derive a learned clause from a conflict using the first unique
+        implication point.
+
+        Parameters
+        ----------
+        conflict : int
+            Index of the unsatisfied clause.
+
+        Returns
+        -------
+        list of int
+            The learned clause. Its first literal is the negation of the
+            implication point, and its second literal (if any) has the
+            highest decision level of the rest.
+        int
+            The decision level to jump back to.
+        """
+        level = self.level
+        reason = self.reason
+        trail = self.trail
+        current = len(self.trail_lim)
+
+        learnt = [None]
+        seen = set()
+        pending = 0
+        index = len(trail) - 1
+        clause = self._clause(conflict)
+        start = 0
+
+        while True:
+            self._bump_clause(clause_idx=conflict)
+
+            for literal in clause[start:]:
+                variable = abs(literal)
+
+                if variable in seen or level[variable] == 0:
                     continue
 
-                if not value:
-                    self._delete_clause(idx)
+                seen.add(variable)
+
+                if level[variable] == current:
+                    pending += 1
                 else:
-                    self._delete_literal(idx, -literal)
+                    learnt.append(literal)
 
-        clauses = set(self.containment[literal])
+            # Find the most recent assignment involved in the conflict.
+            while abs(trail[index]) not in seen:
+                index -= 1
 
-        for idx in clauses:
-            self._clean_containment(idx, literal)
+            literal = trail[index]
+            index -= 1
+            pending -= 1
 
-            if idx not in self.clauses:
-                continue
+            if pending == 0:
+                break
 
-            if value:
-                self._delete_clause(idx)
-            else:
-                self._delete_literal(idx, literal)
+            # The implied literal is always the first in its reason.
+            conflict = reason[abs(literal)]
+            clause = self._clause(conflict)
+            start = 1
+
+        if self.heuristic is not None:
+            self.heuristic.conflict(seen)
+
+        learnt[0] = -literal
+        learnt = self._minimize(learnt, seen)
+
+        if len(learnt) == 1:
+            return learnt, 0
 
-    def _restore(self):
+        # Watch the literal that will be unassigned last.
+        highest = max(range(1, len(learnt)),
+                      key=lambda idx: level[abs(learnt[idx])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+
+        return learnt, level[abs(learnt[1])]
+
+    def _minimize(self, learnt, seen):
         """
-        Undo the most recent stack of changes in the change log.
+        Remove literals from a learned clause that are implied by the
+        other literals in it.
 
-        The change log is a stack of stacks; the top element of this
-        stack is removed and its operations are reversed.
+        Parameters
+        ----------
+        learnt : list of int
+            The learned clause.
+        seen : set of int
+            Variables involved in the conflict analysis. This set is
+            extended with variables that are shown to be redundant.
+
+        Returns
+        -------
+        list of int
+            The minimized clause.
         """
-        log_entry = self.change_log.pop()
+        minimized = [learnt[0]]
 
-        while len(log_entry) > 0:
-            action, idx, content = log_entry.pop()
+        for literal in learnt[1:]:
+            if self.reason[abs(literal)] is None \
+                    or not self._redundant(literal, seen):
+                minimized.append(literal)
 
-            if action is RC:
-                # Recover a clause.
-                self.clauses[idx] = content
-            elif action is RL:
-                # Recover a literal.
-                self.clauses[idx].add(content)
-            elif action is AA:
-                # Undo a variable assignment.
-                del self.assignment[abs(content)]
-            elif action is CC:
-                self.containment[content].add(idx)
-            else:
-                raise ValueError(
-                    f"Cannot restore, action not recognized."
-                    f"({action}, {idx}, {content}")
+        return minimized
 
-    def _remove_tautologies(self):
-        for idx in list(self.clauses.keys()):
-            clause = self.clauses[idx]
+    def _redundant(self, literal, seen):
+        """
+        Check whether a literal of a learned clause is implied by the
+        other literals through the chain of reasons.
+        """
+        stack = [abs(literal)]
+        added = []
 
-            for literal in clause:
-                if -literal in clause:
-                    self._delete_clause(idx)
-                    self._clean_containment(idx, -literal)
-                    break
+        while stack:
+            clause = self._clause(self.reason[stack.pop()])
+
+            for other in clause[1:]:
+                variable = abs(other)
+
+                if variable in seen or self.level[variable] == 0:
+                    continue
+
+                if self.reason[variable] is None:
+                    # Reached a decision that is not in the clause.
+                    for variable in added:
+                        seen.discard(variable)
+
+                    return False
+
+                seen.add(variable)
+                added.append(variable)
+                stack.append(variable)
+
+        return True
 
-    def _get_variables(self):
+    def _learn(self, learnt):
         """
-        Return a set of all literals currently in the set of clauses.
+        Add a learned clause to the arena and assign its asserting
+        literal.
         """
-        variables = set()
+        if len(learnt) == 1:
+            self._enqueue(learnt[0])
+            return
 
-        for idx in self.clauses:
-            # clause = {abs(literal) for literal in self.clauses[idx]}
-            clause = self.clauses[idx]
-            variables = variables | clause
+        idx = len(self.offsets)
 
-        return variables
+        self.offsets.append(len(self.literals))
+        self.lengths.append(len(learnt))
+        self.literals.extend(learnt)
 
-    def _get_containment(self):
+        self.watches[learnt[0]].append(idx)
+        self.watches[learnt[1]].append(idx)
+
+        self.learned.append(idx)
+        self.lbd[idx] = len({self.level[abs(literal)] for literal in learnt})
+        self.clause_activity[idx] = self.clause_increment
+
+        self._enqueue(learnt[0], idx)
+
+    def _bump_clause(self, clause_idx):
         """
-        Construct a dictionary mapping each literal to a list of
-        clauses that contain it.
+        Increase the activity of a learned clause that took part in a
+        conflict.
         """
-        containment = {}
+        if clause_idx not in self.clause_activity:
+            return
 
-        for idx in self.clauses:
-            clause = self.clauses[idx]
+        self.clause_activity[clause_idx] += self.clause_increment
 
-            for literal in clause:
-                if literal in containment:
-                    containment[literal].add(idx)
-                else:
-                    containment[literal] = {idx}
+        if self.clause_activity[clause_idx] > 1e20:
+            # Rescale to prevent overflowing.
+            for idx in self.clause_activity:
+                self.clause_activity[idx] *= 1e-20
 
-        return containment
+            self.clause_increment *= 1e-20
 
-    def _dpll(self):
-        unfinished = True
+    def _locked(self, clause_idx):
+        """
+        Check whether a clause is the reason of a current assignment.
+        """
+        variable = abs(self.literals[self.offsets[clause_idx]])
 
-        while unfinished:
-            unfinished = False
+        return self.values[variable] is not None \
+            and self.reason[variable] == clause_idx
 
-            if len(self.clauses) is 0:
-                # Set of clauses is empty.
-                return True
+    def _reduce_learned(self):
+        """
+        Remove roughly half of the learned clauses, keeping the ones
+        with a low literal block distance and high activity.
 
-            # Check for empty clauses.
-            if set() in self.clauses.values():
-                return False
+        Removed clauses keep their index with a length of zero; their
+        literals are reclaimed once they take up half of the arena.
+        """
+        candidates = sorted(
+            (idx for idx in self.learned
+             if self.lbd[idx] > 2 and not self._locked(idx)),
+            key=lambda idx: (-self.lbd[idx], self.clause_activity[idx]))
+
+        removed = set(candidates[:len(self.learned) // 2])
+
+        for idx in removed:
+            start = self.offsets[idx]
+            self.watches[self.literals[start]].remove(idx)
+            self.watches[self.literals[start + 1]].remove(idx)
+
+            self.garbage += self.lengths[idx]
+            self.lengths[idx] = 0
 
-            # Simplify the set of clauses by assigning the literals of
-            # unit clauses.
-            for idx in list(self.clauses):
-                clause = self.clauses[idx]
+            del self.lbd[idx]
+            del self.clause_activity[idx]
 
-                if len(clause) is 1:
-                    literal = list(clause)[0]
+        self.learned = [idx for idx in self.learned if idx not in removed]
+        self.max_learned *= self.learned_growth
 
-                    # Add an assignment and simplify.
-                    self._add_assignment(literal, value=True)
-                    self._assign_literal(literal)
+        if 2 * self.garbage > len(self.literals):
+            self._compact()
 
-                    # Make sure to keep checking for unit clauses until
-                    # they are all gone.
-                    unfinished = True
-                    break
+    def _compact(self):
+        """
+        Move the live clauses to a new arena without the literals of
+        removed clauses. Clause indices do not change.
+        """
+        literals = array('i')
+
+        for idx, length in enumerate(self.lengths):
+            start = self.offsets[idx]
+            self.offsets[idx] = len(literals)
+            literals.extend(self.literals[start:start + length])
+
+        self.literals = literals
+        self.garbage = 0
+
+    def _cdcl(self):
+        tracer = self.tracer
+        checks = 0
+
+        while True:
+            head = self.queue_head
+            conflict = self._propagate()
+
+            if tracer is not None:
+                tracer.on_propagate(self, self.trail[head:self.queue_head])
+
+            checks += 1
+            if self._out_of_budget(checks):
+                return None
 
-        # Select a literal to split.
-        literal, value = self.split(self)
+            if conflict is not None:
+                self.conflicts += 1
+                self.splits += 1
 
-        self.change_log.append([])
+                if tracer is not None:
+                    # Analysis reorders the literals of the clause.
+                    clause = self._clause(conflict)
 
-        self._add_assignment(literal, value)
-        self._assign_literal(literal)
+                if len(self.trail_lim) == 0:
+                    # Conflict without any decisions.
+                    self.unsatisfiable = True
 
-        satisfied = self._dpll()
+                    if tracer is not None:
+                        tracer.on_conflict(self, clause)
 
-        if satisfied:
-            return True
+                    return False
 
-        # Restore the state to the previous split to prepare for the
-        # next one.
-        self._restore()
-        self.splits += 1
+                learnt, level = self._analyze(conflict)
+                self._backtrack_to(level)
+                self._learn(learnt)
 
-        self._add_assignment(literal, not value)
-        self._assign_literal(literal)
+                self.clause_increment /= self.clause_decay
 
-        return self._dpll()
+                if len(self.learned) >= self.max_learned:
+                    self._reduce_learned()
+
+                if tracer is not None:
+                    tracer.on_conflict(self, clause)
+
+                continue
+
+            if len(self.trail_lim) < len(self.assumptions):
+                literal = self.assumptions[len(self.trail_lim)]
+                value = self.values[abs(literal)]
+
+                if value is not None and value != (literal > 0):
+                    # The assumptions contradict the clauses.
+                    return False
+
+                # An assumption that already holds gets an empty level,
+                # so that level i + 1 always belongs to assumption i.
+                self.trail_lim.append(len(self.trail))
+                self._enqueue(literal)
+                continue
+
+            if len(self.trail) == self.num_variables:
+                # Every variable is assigned without conflicts.
+                return True
+
+            literal, value = self.split(self)
+            self.decisions += 1
+
+            if not value:
+                literal = -literal
+
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(literal)
+
+            if tracer is not None:
+                tracer.on_decision(self, literal)
 
 
 class GreedySolver(Solver):
+    """
+    GSAT local search.
+
+    The score of a variable, the change in the number of satisfied
+    clauses when flipping it, is updated only for the variables that
+    share a clause with a flipped variable. Variables are kept in buckets
+    by score so the best flip is found without scanning all variables.
+    """
     def __init__(self, clauses):
         super(GreedySolver, self).__init__(clauses)
 
         self.max_retries = 20
         self.max_flips = 10000
+        self.variables = sorted(self.clauses.variables())
+
+        self.restarts = 0
+        self.flips = 0
+        self.total_flips = 0
+        self.try_start = 0
+
+        # Number of true literals in each clause and the sum of their
+        # variables, which is the critical variable when there is only
+        # one true literal.
+        self.true_count = [0] * len(self.clauses)
+        self.true_sum = [0] * len(self.clauses)
+        self.unsat_count = 0
+
+        # A score can not exceed the number of clauses a variable occurs in.
+        clauses = self.clauses
+        self.max_score = max((
+            len(clauses.occurrences_of(variable))
+            + len(clauses.occurrences_of(-variable))
+            for variable in self.variables), default=0)
+
+        self.score = [0] * len(self.values)
+        self.buckets = []
+        self.bucket_position = [0] * len(self.values)
+        self.best = 0
 
     def solve(self):
+        """
+        Run GSAT.
+
+        Returns
+        -------
+        bool or None
+            True if a solution was found, None if the search gave up.
+        """
         # self._remove_tautologies()
+        start = time.perf_counter()
+        setup_time = self.setup_time
+        self._start_budget()
 
-        return self.gsat()
+        try:
+            with self._reporter():
+                return self.gsat()
+        finally:
+            # Building the state of a try is setup, not search.
+            self.search_time += time.perf_counter() - start \
+                - (self.setup_time - setup_time)
 
     def guess_assignment(self):
         """
         Guess an initial assignment.
         """
-        variables = self._get_variables()
+        for variable in self.variables:
+            if self.values[variable] is not None and random.random() > 0.9:
+                self.values[variable] = not self.values[variable]
 
-        for variable in variables:
-            if variable < 0:
-                continue
+            self.values[variable] = random.random() > 0.85
 
-            if variable in self.assignment and random.random() > 0.9:
-                self.assignment[variable] = not self.assignment[variable]
+    def check_sat(self):
+        sat_score = len(self.clauses) - self.unsat_count
 
-            self.assignment[variable] = random.random() > 0.85
+        return self.unsat_count == 0, sat_score
 
-        self.change_log = [[]]
+    def _progress(self):
+        """
+        Describe the progress of the current try.
+        """
+        score = len(self.clauses) - self.unsat_count
 
-    def check_sat(self):
-        sat_score = 0
-        sat = True
+        return (f"{self.restarts}:{self.total_flips - self.try_start:05d}: "
+                f"{score}/{len(self.clauses)} ")
+
+    def predict_score(self, variable):
+        """
+        Predict the change in the number of satisfied clauses after
+        flipping a variable.
+        """
+        return self.score[variable]
+
+    def _count_true_literals(self):
+        """
+        Compute the true literal counts and the scores from scratch, and
+        sort the variables into buckets.
+        """
+        values = self.values
+        score = self.score = [0] * len(values)
+        self.unsat_count = 0
 
-        for idx in self.clauses:
-            clause = self.clauses[idx]
+        for idx, clause in enumerate(self.clauses):
+            count = 0
+            total = 0
 
             for literal in clause:
-                if self._get_assignment(literal):
-                    sat_score += 1
-                    break
-            else:
-                sat = False
+                if values[abs(literal)] == (literal > 0):
+                    count += 1
+                    total += abs(literal)
+
+            self.true_count[idx] = count
+            self.true_sum[idx] = total
+
+            if count == 0:
+                self.unsat_count += 1
+
+                for literal in clause:
+                    score[abs(literal)] += 1
+            elif count == 1:
+                score[total] -= 1
+
+        # Bucket `max_score + s` holds the variables with score `s`.
+        self.buckets = [[] for _ in range(2 * self.max_score + 1)]
+
+        for variable in self.variables:
+            bucket = self.buckets[score[variable] + self.max_score]
+            self.bucket_position[variable] = len(bucket)
+            bucket.append(variable)
 
-        return sat, sat_score
+        self.best = len(self.buckets) - 1
+        self._find_best()
 
-    def predict_score(self, literal):
+    def _change_score(self, variable, delta):
         """
-        Predict number of satisfied clauses after flipping a literal.
+        Change the score of a variable and move it to its new bucket.
         """
-        score = 0
+        buckets = self.buckets
+        offset = self.max_score
+        old = self.score[variable]
+        new = old + delta
+        self.score[variable] = new
 
-        for idx in self.containment[literal]:
-            clause = self.clauses[idx]
+        # Swap the variable with the last one of its bucket and remove it.
+        bucket = buckets[old + offset]
+        position = self.bucket_position[variable]
+        last = bucket.pop()
 
-            # Count the number of satisfied literals.
-            sat_literals = 0
-            for lit in clause:
-                if self._get_assignment(lit):
-                    sat_literals += 1
+        if last != variable:
+            bucket[position] = last
+            self.bucket_position[last] = position
 
-            if sat_literals is 0:
-                # If before no literals where satisfied, flipping one will
-                # satisfy the clause.
-                score += 1
-            elif sat_literals is 1 and self._get_assignment(literal):
-                # If the literal is the only satisfied literal in the clause,
-                # flipping it will make the whole clause unsatisfied.
-                score -= 1
+        bucket = buckets[new + offset]
+        self.bucket_position[variable] = len(bucket)
+        bucket.append(variable)
 
-        if literal > 0:
-            return score + self.predict_score(-literal)
-        else:
-            return score
+        if new + offset > self.best:
+            self.best = new + offset
 
-    def gsat(self):
-        self.containment = self._get_containment()
+    def _find_best(self):
+        """
+        Lower the best bucket index until it points at a nonempty bucket.
+        """
+        while self.best > 0 and not self.buckets[self.best]:
+            self.best -= 1
+
+    def _flip(self, variable):
+        """
+        Flip a variable and update the scores of its neighbours.
+        """
+        clauses = self.clauses
+        true_count = self.true_count
+        true_sum = self.true_sum
+        change = self._change_score
+
+        value = not self.values[variable]
+        self.values[variable] = value
+        self.total_flips += 1
+        true_literal = variable if value else -variable
+
+        if self.count_clause_visits:
+            self.clause_visits += len(clauses.occurrences_of(variable)) \
+                + len(clauses.occurrences_of(-variable))
+
+        for idx in clauses.occurrences_of(true_literal):
+            count = true_count[idx]
+
+            if count == 0:
+                # The clause is now satisfied, so flipping any of its other
+                # variables gains nothing, but flipping this one breaks it.
+                self.unsat_count -= 1
+
+                for literal in clauses[idx]:
+                    if abs(literal) != variable:
+                        change(abs(literal), -1)
+
+                change(variable, -2)
+            elif count == 1:
+                # The previously critical variable is not anymore.
+                change(true_sum[idx], 1)
+
+            true_count[idx] = count + 1
+            true_sum[idx] += variable
+
+        for idx in clauses.occurrences_of(-true_literal):
+            count = true_count[idx]
+            true_count[idx] = count - 1
+            true_sum[idx] -= variable
 
+            if count == 1:
+                self.unsat_count += 1
+
+                for literal in clauses[idx]:
+                    if abs(literal) != variable:
+                        change(abs(literal), 1)
+
+                change(variable, 2)
+            elif count == 2:
+                # The remaining true literal became critical.
+                change(true_sum[idx], -1)
+
+        self._find_best()
+
+        if self.tracer is not None:
+            self.tracer.on_flip(self, variable)
+
+    def gsat(self):
         for iteration in range(self.max_retries):
             self.guess_assignment()
+            start = time.perf_counter()
+            self._count_true_literals()
+            self.setup_time += time.perf_counter() - start
+
+            self.restarts = iteration
+            self.try_start = self.total_flips
+
+            if self.tracer is not None:
+                self.tracer.on_restart(self)
 
             for idx in range(self.max_flips):
                 sat, score = self.check_sat()
 
-                sys.stdout.write(f"\r{idx:05d}: {score}/{len(self.clauses)} ")
-                sys.stdout.flush()
-
                 if sat:
+                    self.flips = idx
                     return True
 
-                best_score = -1e10
-                ties = []
-
-                for literal in self.containment:
-                    if literal < 0:
-                        continue
-
-                    score = self.predict_score(literal)
-
-                    if score > best_score:
-                        best_score = score
-                        ties = [literal]
-                    elif score is best_score:
-                        ties.append(literal)
+                if self._out_of_flips(idx):
+                    self.flips = idx
+                    return None
 
                 if random.random() > 0.2:
-                    literal = random.choice(ties)
-                    best_score = self.predict_score(literal)
+                    variable = random.choice(self.buckets[self.best])
                 else:
-                    literal = random.choice(list(self._get_variables()))
+                    variable = random.choice(self.variables)
 
-                print(literal, best_score)
+                self._flip(variable)
 
-                value = self._get_assignment(literal)
-                self._add_assignment(literal, not value)
+            self.flips = self.max_flips
 
-            print("Restart")
-
-        return False
+        # Local search can not prove that there is no solution.
+        self.exhausted = 'tries'
+        return None
 
 
 class WalkSAT(Solver):
-    def __init__(self, clauses, simplify=False):
+    """
+    WalkSAT local search.
+
+    The number of true literals in every clause, the list of unsatisfied
+    clauses and the make and break counts of every variable are updated
+    with each flip, so a flip only visits the clauses that contain the
+    flipped variable.
+
+    Besides the original mix of greedy and random flips, two methods
+    pick a variable of a random unsatisfied clause from the cached
+    counts alone. probSAT flips a variable with a probability that falls
+    polynomially with its break count, (eps + break) ** -cb. Novelty+
+    flips the variable with the best make minus break count, unless it
+    is the most recently flipped one of the clause, in which case the
+    second best is flipped with probability `noise`; with probability
+    `wp` it flips a random variable of the clause. The noise adapts to
+    the search: it rises when the number of unsatisfied clauses has not
+    improved for `theta` times the number of clauses flips and drops
+    with every improvement.
+
+    Parameters
+    ----------
+    clauses : ClauseDatabase or iterable of iterable of int
+    simplify : bool, optional
+        Propagate the unit clauses before the search.
+    method : str, optional
+        One of 'walksat', 'probsat' and 'novelty+'.
+    """
+    def __init__(self, clauses, simplify=False, method='walksat'):
         super(WalkSAT, self).__init__(clauses)
 
+        if method not in WALK_METHODS:
+            raise ValueError(f"'{method}' is not a valid method, please "
+                             f"select one of {', '.join(WALK_METHODS)}.")
+
+        self.method = method
+
+        # Break function of probSAT, tuned for random 3-SAT.
+        self.cb = 2.38
+        self.eps = 1.0
+
+        # Random walk probability and adaptive noise of Novelty+.
+        self.wp = 0.01
+        self.noise = 0.0
+        self.phi = 0.2
+        self.theta = 1 / 6
+
         self.restarts = 0
         self.max_tries = 10
         self.flips = 0
         self.max_flips = 10000
-        self.containment = self._get_containment()
-        self.assignment = self._guess_assignment()
+        self.total_flips = 0
+        self.try_start = 0
+
+        # False once propagating the unit clauses ran into a conflict.
+        self.prepared = True
 
         if simplify:
-            # Simplify by removing unit clauses.
-            for clause in list(self.clauses.values()):
-                if len(clause) is 1:
-                    literal = list(clause)[0]
-                    self._add_assignment(literal, True)
-                    self._assign_literal(literal)
+            # Simplify by propagating unit clauses.
+            self.prepared = self._simplify()
+
+        self.variables = sorted(self.clauses.variables())
+
+        # Number of true literals in each clause and the sum of their
+        # variables, which is the critical variable when there is only
+        # one true literal.
+        self.true_count = [0] * len(self.clauses)
+        self.true_sum = [0] * len(self.clauses)
+
+        # Unsatisfied clauses and the position of each clause in that
+        # list (-1 for satisfied clauses).
+        self.unsat = []
+        self.unsat_position = [-1] * len(self.clauses)
+
+        self.make = [0] * len(self.values)
+        self.breaks = [0] * len(self.values)
+
+        # Total number of flips when each variable was last flipped.
+        self.flipped_at = [0] * len(self.values)
+
+        # probSAT weight of every break count, see `_weigh_breaks`.
+        self.break_weights = []
 
-            self.containment = self._get_containment()
-            self.assignment = self._guess_assignment(self.assignment)
+        # Fewest unsatisfied clauses since the noise last changed.
+        self.best_unsat = 0
+        self.noise_changed = 0
+
+        self.true_variables = 0
+        self.assigned = 0
+
+        self._guess_assignment()
+
+    @property
+    def flips_per_second(self):
+        """
+        Average number of flips per second over all tries.
+        """
+        if self.search_time == 0:
+            return 0.0
+
+        return self.total_flips / self.search_time
 
     def solve(self):
+        """
+        Run WalkSAT.
+
+        Returns
+        -------
+        bool or None
+            True if a solution was found, False if propagating the unit
+            clauses already ran into a conflict and None if the search
+            gave up.
+        """
+        self._start_budget()
+
+        if not self.prepared:
+            return False
+
+        start = time.perf_counter()
+        setup_time = self.setup_time
+
+        try:
+            with self._reporter():
+                return self._walk()
+        finally:
+            # Building the state of a try is setup, not search.
+            self.search_time += time.perf_counter() - start \
+                - (self.setup_time - setup_time)
+
+    def _walk(self):
+        if self.method == 'probsat':
+            self._weigh_breaks()
+
         for retry in range(self.max_tries):
-            self.assignment = self._guess_assignment(self.assignment)
+            self._guess_assignment()
+            start = time.perf_counter()
+            self._count_true_literals()
+            self.setup_time += time.perf_counter() - start
+
+            self.restarts = retry
+            self.try_start = self.total_flips
+            self.noise = 0.0
+            self.best_unsat = len(self.unsat)
+            self.noise_changed = 0
+
+            if self.tracer is not None:
+                self.tracer.on_restart(self)
 
             for flip in range(self.max_flips):
                 sat, score = self._check_sat()
-                true_rate = sum(value for value in self.assignment.values())
-                true_rate /= len(self.assignment)
-
-                sys.stdout.write(
-                    f"\r{retry}:{flip} | Score: {score}/{len(self.clauses)} |"
-                    f" {100 * true_rate:.1f}%")
-                sys.stdout.flush()
 
                 if sat:
-                    self.flips = flip + 1
+                    self.flips = flip
                     self.restarts = retry
                     return True
 
+                if self._out_of_flips(flip):
+                    self.flips = flip
+                    self.restarts = retry
+                    return None
+
+                if self.method == 'probsat':
+                    self._flip(self._pick_probsat())
+                    continue
+                elif self.method == 'novelty+':
+                    self._flip(self._pick_novelty())
+                    self._adapt_noise(flip + 1)
+                    continue
+
                 select = random.random()
                 progress = flip / self.max_flips
                 p_walk = progress * 0.7 + (1 - progress) * 0.9
@@ -434,171 +1564,293 @@ class WalkSAT(Solver):
                 elif select <= p_best:
                     self._flip_best_literal()
                 else:
-                    literal = random.choice(list(self.containment.keys()))
-                    value = self._get_assignment(literal)
-                    self._add_assignment(literal, not value)
+                    self._flip(abs(random.choice(self.clauses.order)))
+
+            self.flips = self.max_flips
 
-        self.restarts = retry
-        self.flips = flip + 1
-        return sat
+        # Local search can not prove that there is no solution.
+        self.exhausted = 'tries'
+        return None
 
-    def _get_containment(self):
-        containment = {}
+    def _weigh_breaks(self):
+        """
+        Tabulate the probSAT weight of every possible break count.
 
-        for idx in self.clauses:
-            clause = self.clauses[idx]
+        A variable breaks at most the clauses that contain its true
+        literal.
+        """
+        clauses = self.clauses
+        longest = max((len(clauses.occurrences_of(literal))
+                       for variable in self.variables
+                       for literal in (variable, -variable)), default=0)
 
-            for literal in clause:
-                if literal not in containment:
-                    containment[literal] = {idx}
-                else:
-                    containment[literal].add(idx)
+        self.break_weights = [(self.eps + count) ** -self.cb
+                              for count in range(longest + 1)]
+
+    def _pick_probsat(self):
+        """
+        Pick a variable of a random unsatisfied clause, weighted by the
+        probSAT break function.
+        """
+        clause = self.clauses[random.choice(self.unsat)]
+        breaks = self.breaks
+        weights = self.break_weights
+
+        return abs(random.choices(
+            clause, [weights[breaks[abs(literal)]] for literal in clause])[0])
+
+    def _pick_novelty(self):
+        """
+        Pick a variable of a random unsatisfied clause by Novelty+.
+        """
+        clause = self.clauses[random.choice(self.unsat)]
 
-        return containment
+        if random.random() < self.wp:
+            return abs(random.choice(clause))
 
-    def _guess_assignment(self, assignment=None, soft=0.5):
+        make = self.make
+        breaks = self.breaks
+        flipped_at = self.flipped_at
+
+        best = second = youngest = None
+        best_score = second_score = None
+
+        for literal in clause:
+            variable = abs(literal)
+            score = make[variable] - breaks[variable]
+
+            if youngest is None \
+                    or flipped_at[variable] > flipped_at[youngest]:
+                youngest = variable
+
+            # Ties go to the variable that was flipped longest ago.
+            if best is None or score > best_score or (
+                    score == best_score
+                    and flipped_at[variable] < flipped_at[best]):
+                second, second_score = best, best_score
+                best, best_score = variable, score
+            elif variable != best and (
+                    second is None or score > second_score or (
+                        score == second_score
+                        and flipped_at[variable] < flipped_at[second])):
+                second, second_score = variable, score
+
+        if best == youngest and second is not None \
+                and random.random() < self.noise:
+            return second
+
+        return best
+
+    def _adapt_noise(self, flip):
+        """
+        Raise the noise when the search stagnates and lower it when the
+        number of unsatisfied clauses improves.
+        """
+        unsat = len(self.unsat)
+
+        if unsat < self.best_unsat:
+            self.noise -= self.noise * self.phi / 2
+        elif flip - self.noise_changed > self.theta * len(self.clauses):
+            self.noise += (1 - self.noise) * self.phi
+        else:
+            return
+
+        self.best_unsat = unsat
+        self.noise_changed = flip
+
+    def _progress(self):
+        """
+        Describe the progress of the current try.
+        """
+        score = len(self.clauses) - len(self.unsat)
+        true_rate = self.true_variables / max(1, self.assigned)
+
+        return (f"{self.restarts}:{self.total_flips - self.try_start} | "
+                f"Score: {score}/{len(self.clauses)} | "
+                f"{100 * true_rate:.1f}%")
+
+    def _guess_assignment(self, soft=0.5):
         """
         Guess a random assignment.
-        If an assignment is provided, a 'soft reset' will be
-        performed, leaving most assignments intact.
+        Variables that already have a value undergo a 'soft reset',
+        leaving most assignments intact.
 
         Parameters
         ----------
-        assignment : dict, optional
-            A given assignment. If this is not None, a soft
-            reset will be performed as determined by `soft`.
         soft : float, optional
-            If an assignment is given, this value determines
-            the probability of leaving an assignment intact
-            when resetting.
+            This value determines the probability of leaving an
+            existing assignment intact when resetting.
+        """
+        for variable in self.variables:
+            if self.values[variable] is not None and random.random() < soft:
+                continue
 
-        Returns
-        -------
-        dict
-            Either a new assignment dictionary or an updated
-            variant of the given assignment.
+            self.values[variable] = random.random() < 0.1
+
+    def _count_true_literals(self):
         """
-        if assignment is None:
-            assignment = {}
+        Compute the true literal counts, the unsatisfied clauses and the
+        make and break counts from scratch for the current assignment.
+        """
+        values = self.values
+        make = self.make = [0] * len(values)
+        breaks = self.breaks = [0] * len(values)
 
-        for literal in self.containment:
-            if literal > 0:
-                if literal in assignment and random.random() < soft:
-                    continue
+        self.unsat = []
+        self.true_variables = values.count(True)
+        self.assigned = len(values) - values.count(None)
 
-                assignment[literal] = random.random() < 0.1
+        for idx, clause in enumerate(self.clauses):
+            count = 0
+            total = 0
 
-        return assignment
+            for literal in clause:
+                if values[abs(literal)] == (literal > 0):
+                    count += 1
+                    total += abs(literal)
 
-    def _check_sat(self):
-        unsat_clauses = self._find_unsat()
-        # print(unsat_clauses, len(unsat_clauses), len(unsat_clauses) is 0)
+            self.true_count[idx] = count
+            self.true_sum[idx] = total
 
-        score = len(self.clauses) - len(unsat_clauses)
+            if count == 0:
+                self.unsat_position[idx] = len(self.unsat)
+                self.unsat.append(idx)
 
-        if len(unsat_clauses) is 0:
-            return True, score
+                for literal in clause:
+                    make[abs(literal)] += 1
+            else:
+                self.unsat_position[idx] = -1
 
-        return False, score
+                if count == 1:
+                    breaks[total] += 1
 
-    def _predict_score(self, literal):
-        try:
-            clauses = self.containment[literal]
-        except KeyError:
-            return 0
+    def _flip(self, variable):
+        """
+        Flip a variable and update the counts of the clauses that
+        contain it.
+        """
+        clauses = self.clauses
+        true_count = self.true_count
+        true_sum = self.true_sum
+        make = self.make
+        breaks = self.breaks
+
+        value = not self.values[variable]
+        self.values[variable] = value
+        self.total_flips += 1
+        self.flipped_at[variable] = self.total_flips
+
+        if value:
+            self.true_variables += 1
+            true_literal = variable
+        else:
+            self.true_variables -= 1
+            true_literal = -variable
 
-        sat_clauses = 0
+        if self.count_clause_visits:
+            self.clause_visits += len(clauses.occurrences_of(variable)) \
+                + len(clauses.occurrences_of(-variable))
 
-        for idx in clauses:
-            clause = self.clauses[idx]
-            sat_literals = 0
+        for idx in clauses.occurrences_of(true_literal):
+            count = true_count[idx]
 
-            # print(idx, clause)
-            for literal_ in clause:
-                if self._get_assignment(literal_):
-                    sat_literals += 1
+            if count == 0:
+                self._remove_unsat(idx)
 
-            if sat_literals is 0:
-                sat_clauses += 1
-            elif sat_literals is 1 and self._get_assignment(literal):
-                sat_clauses -= 1
+                for literal in clauses[idx]:
+                    make[abs(literal)] -= 1
 
-        return sat_clauses
+                breaks[variable] += 1
+            elif count == 1:
+                # The previously critical variable is not anymore.
+                breaks[true_sum[idx]] -= 1
 
-    def _add_assignment(self, literal, value):
+            true_count[idx] = count + 1
+            true_sum[idx] += variable
+
+        for idx in clauses.occurrences_of(-true_literal):
+            count = true_count[idx]
+            true_count[idx] = count - 1
+            true_sum[idx] -= variable
+
+            if count == 1:
+                self._add_unsat(idx)
+
+                for literal in clauses[idx]:
+                    make[abs(literal)] += 1
+
+                breaks[variable] -= 1
+            elif count == 2:
+                # The remaining true literal became critical.
+                breaks[true_sum[idx]] += 1
+
+        if self.tracer is not None:
+            self.tracer.on_flip(self, variable)
+
+    def _add_unsat(self, idx):
+        self.unsat_position[idx] = len(self.unsat)
+        self.unsat.append(idx)
+
+    def _remove_unsat(self, idx):
+        # Move the last unsatisfied clause into the freed position.
+        position = self.unsat_position[idx]
+        last = self.unsat.pop()
+
+        if last != idx:
+            self.unsat[position] = last
+            self.unsat_position[last] = position
+
+        self.unsat_position[idx] = -1
+
+    def _check_sat(self):
+        score = len(self.clauses) - len(self.unsat)
+
+        if len(self.unsat) == 0:
+            return True, score
+
+        return False, score
+
+    def _predict_score(self, variable):
         """
-        Add an assignment
+        Predict the change in the number of satisfied clauses when
+        flipping a variable.
         """
-        if literal < 0:
-            literal = abs(literal)
-            value = not value
-
-        self.assignment[literal] = value
+        return self.make[variable] - self.breaks[variable]
 
     def _flip_best_literal(self):
         ties = []
         best_score = -1e10
 
-        for literal in self.containment:
-            if literal < 0:
-                continue
-
-            score = self._predict_score(literal) \
-                + self._predict_score(-literal)
+        for variable in self.variables:
+            score = self.make[variable] - self.breaks[variable]
 
             if score > best_score:
-                ties = [literal]
+                ties = [variable]
                 best_score = score
-            elif score is best_score:
-                ties.append(literal)
-
-        literal = random.choice(ties)
-
-        value = self._get_assignment(literal)
-        self._add_assignment(literal, not value)
+            elif score == best_score:
+                ties.append(variable)
 
-        # print(literal, value, best_score, ties)
+        self._flip(random.choice(ties))
 
     def _random_walk(self):
-        unsat_clauses = self._find_unsat()
-        # print(unsat_clauses)
-
-        clause = random.choice(list(unsat_clauses.values()))
+        clause = self.clauses[random.choice(self.unsat)]
 
         ties = []
         best_score = -1e10
 
         for literal in clause:
-            if literal < 0:
-                continue
-
-            score = self._predict_score(literal) \
-                + self._predict_score(-literal)
+            score = self._predict_score(abs(literal))
 
             if score > best_score:
-                ties = [literal]
+                ties = [abs(literal)]
                 best_score = score
-            elif score is best_score:
-                ties.append(literal)
+            elif score == best_score:
+                ties.append(abs(literal))
 
-        if len(ties) > 0:
-            literal = random.choice(ties)
-        else:
-            literal = random.choice(list(clause))
-
-        self._add_assignment(literal, not self._get_assignment(literal))
+        self._flip(random.choice(ties))
 
     def _find_unsat(self):
-        unsat_clauses = {}
-        for idx, clause in self.clauses.items():
-            # print("find_unsat", idx, clause)
-            for literal in clause:
-                if self._get_assignment(literal):
-                    break
-            else:
-                unsat_clauses[idx] = clause
-
-        return unsat_clauses
+        return {idx: self.clauses[idx] for idx in self.unsat}
 
 
 def generate_random_problems(n, variables=600, clause_size=3,
@@ -714,13 +1966,81 @@ def test_walksat():
         print(draw)
 
 
-def run(cnf, strategy=1, output=True, silent=False):
+def test_incremental(path='top95.sdk.txt'):
+    """
+    Solve a file of puzzles with one solver, passing only the givens of
+    each puzzle as assumptions.
+    """
+    solver = CDCLSolver(load_rules(), split=VSIDS())
+    successes = []
+
+    for givens in load_givens(path):
+        satisfied = solver.solve(assumptions=givens)
+        draw = draw_assignment(solver.assignment)
+        entries = [int(char) for char in draw if char in '123456789']
+
+        successes.append(satisfied and check_sudoku(entries))
+
+    print(f"Solved {sum(successes)}/{len(successes)} | "
+          f"Learned clauses: {len(solver.learned)} | "
+          f"Conflicts: {solver.conflicts}")
+
+
+def test_read_dimacs():
+    """
+    Parse small DIMACS files with unusual layouts, among them one
+    without any clauses, which every strategy should satisfy.
+    """
+    cases = [
+        (b"c no clauses\np cnf 0 0\n", []),
+        (b"", []),
+        (b"p cnf 3 2\n1 -2 0\n2 3 0\n", [[1, -2], [2, 3]]),
+        # The last clause omits its terminator.
+        (b"p cnf 2 2\n1 0\n-1 2", [[1], [-1, 2]]),
+        # SATLIB files end with a percent sign.
+        (b"p cnf 2 1\n1 2 0\n%\n0\n", [[1, 2]]),
+        # Repeated literals are dropped.
+        (b"p cnf 2 1\n1 1 -2 0\n", [[1, -2]]),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.cnf')
+
+        for text, clauses in cases:
+            with open(path, 'wb') as file:
+                file.write(text)
+
+            database = read_dimacs(path)
+            assert [list(clause) for clause in database] == clauses, text
+
+            if not clauses:
+                for strategy in range(1, 14):
+                    solver = select_solver(database, strategy, silent=True)
+                    assert solver.solve(), strategy
+
+    print("Parsed every DIMACS file")
+
+
+def select_solver(clauses, strategy=1, silent=False):
+    """
+    Create the solver for a strategy number.
+
+    Parameters
+    ----------
+    clauses : ClauseDatabase or iterable of iterable of int
+    strategy : int, optional
+        A number from 1 to 13, see `run`.
+    silent : bool, optional
+        Do not print the name of the strategy.
+
+    Returns
+    -------
+    Solver
+    """
     def print_(string):
         if not silent:
             print(string)
 
-    clauses = load_dimacs(cnf)
-
     if strategy is 1:
         print_("Selected basic Davis-Putnam")
         solver = Solver(clauses, split=naive_split)
@@ -730,29 +2050,111 @@ def run(cnf, strategy=1, output=True, silent=False):
     elif strategy is 3:
         print_("Selected WalkSAT")
         solver = WalkSAT(clauses, True)
+    elif strategy is 4:
+        print_("Selected Davis-Putnam with watched literals")
+        solver = WatchedSolver(clauses, split=naive_split)
+    elif strategy is 5:
+        print_("Selected conflict-driven clause learning")
+        solver = CDCLSolver(clauses, split=naive_split)
+    elif strategy is 6:
+        print_("Selected conflict-driven clause learning with VSIDS")
+        solver = CDCLSolver(clauses, split=VSIDS())
+    elif strategy is 7:
+        print_("Selected Davis-Putnam with one-sided Jeroslow-Wang")
+        solver = WatchedSolver(clauses, split=JeroslowWang())
+    elif strategy is 8:
+        print_("Selected Davis-Putnam with two-sided Jeroslow-Wang")
+        solver = WatchedSolver(clauses, split=JeroslowWang(two_sided=True))
+    elif strategy is 9:
+        print_("Selected Davis-Putnam with DLIS")
+        solver = WatchedSolver(clauses, split=DLIS())
+    elif strategy is 10:
+        print_("Selected Davis-Putnam with MOMs")
+        solver = WatchedSolver(clauses, split=MOMs())
+    elif strategy is 11:
+        # NumPy is only needed for this strategy.
+        from vectorized import VectorWalkSAT
+
+        print_("Selected vectorized WalkSAT")
+        solver = VectorWalkSAT(clauses)
+    elif strategy is 12:
+        print_("Selected probSAT")
+        solver = WalkSAT(clauses, True, method='probsat')
+    elif strategy is 13:
+        print_("Selected Novelty+ with adaptive noise")
+        solver = WalkSAT(clauses, True, method='novelty+')
     else:
-        raise ValueError(f"'{args.strategy}' is not a valid strategy."
-                         f"Please select 1, 2, or 3.")
+        raise ValueError(f"'{strategy}' is not a valid strategy."
+                         f"Please select a number from 1 to 13.")
+
+    solver.silent = silent
+
+    return solver
+
+
+def run(cnf, strategy=1, output=True, silent=False, timeout=None,
+        statistics=False, profile=None):
+    def print_(string):
+        if not silent:
+            print(string)
+
+    start = time.perf_counter()
+    clauses = load_database(cnf)
+    parse_time = time.perf_counter() - start
+
+    solver = select_solver(clauses, strategy, silent)
+    solver.set_budget(seconds=timeout)
+    solver.count_clause_visits = statistics
+
+    if profile is not None:
+        solver.tracer = PhaseProfiler(profile)
 
     satisfied = solver.solve()
-    print_("Satisfied" if satisfied else "Unsatisfied")
+
+    if satisfied is None:
+        print_(f"Unknown, out of {solver.exhausted}")
+    else:
+        print_("Satisfied" if satisfied else "Unsatisfied")
+
+    if isinstance(solver, CDCLSolver):
+        print_(f"Conflicts: {solver.conflicts} | "
+               f"Decisions: {solver.decisions} | "
+               f"Propagations: {solver.propagations}")
+    elif hasattr(solver, 'flips_per_second'):
+        print_(f"Flips: {solver.total_flips} | "
+               f"Flips/s: {solver.flips_per_second:.0f}")
+
+    if statistics:
+        solver.statistics(parse_time).write(cnf + '.stats.json')
+
+    if profile is not None:
+        solver.tracer.write(cnf + '.profile')
 
     if output:
-        filename = cnf + '.out'
-        with open(filename, 'w') as output:
-            if not satisfied:
-                output.write("")
-                return
-
-            for key, value in sorted(solver.assignment.items()):
-                if value:
-                    output.write(f"{key}\n")
-                else:
-                    output.write(f"-{key}\n")
+        write_assignment(cnf, satisfied, solver.assignment)
     else:
         return solver
 
 
+def write_assignment(cnf, satisfied, assignment):
+    """
+    Write a truth assignment to the `.out` file of a CNF file, one
+    literal per line. The file is left empty if the problem is not
+    satisfied.
+    """
+    filename = cnf + '.out'
+    with open(filename, 'w') as output:
+        if not satisfied:
+            output.write("")
+            return
+
+        for key, value in sorted(assignment.items()):
+            if value:
+                output.write(f"{key}\n")
+            else:
+                output.write(f"-{key}\n")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="SAT Solver")
     parser.add_argument('-S', metavar='N', dest='strategy', type=int,
@@ -761,6 +2163,31 @@ if __name__ == "__main__":
                         help="Input file in DIMACS CNF format.")
     parser.add_argument('--noouput', dest='nooutput', type=bool,
                         help="Do not write the truth assignment to a file.")
+    parser.add_argument('--portfolio', metavar='N,N,...', default=None,
+                        help="Race the given strategies in parallel "
+                             "processes instead of running -S.")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Seconds after which the search gives up.")
+    parser.add_argument('--stats', action='store_true',
+                        help="Write the statistics of the solver to the "
+                             "`.stats.json` file of the problem.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Time the phases of the search and write a "
+                             "summary to the `.profile` file of the "
+                             "problem.")
+    parser.add_argument('--sample', metavar='N', type=int, default=1,
+                        help="Only time about one in N phases when "
+                             "profiling.")
     args = parser.parse_args()
 
-    run(args.cnf, args.strategy, not args.nooutput)
+    if args.portfolio is not None:
+        from portfolio import run_portfolio
+
+        strategies = [int(strategy) for strategy
+                      in args.portfolio.split(',') if strategy]
+        run_portfolio(args.cnf, strategies or None, not args.nooutput,
+                      timeout=args.timeout)
+    else:
+        run(args.cnf, args.strategy, not args.nooutput, timeout=args.timeout,
+            statistics=args.stats,
+            profile=args.sample if args.profile else None)
@@ -3,6 +3,11 @@ Splitting methods and heuristics for the David Putnam solver.
 
 Each method takes a Solver instance as argument and returns a literal
 and the value to set it to.
+
+Heuristics that keep state between splits subclass `Heuristic`. The
+solver notifies them when it sets up its clauses, when it unassigns
+variables and when it runs into a conflict. Since the state belongs to
+a single search, every solver needs its own instance.
 """
 import random
 
@@ -11,9 +16,8 @@ def naive_split(solver):
     """
     Simply pick the first variable that comes up and set it to True.
     """
-    variables = [key for key, value in solver.containment.items()
-                 if len(value) > 0]
-    literal = variables[0]
+    literal = next(literal for literal in solver.clauses.order
+                   if solver.values[abs(literal)] is None)
     value = True
 
     return literal, value
@@ -23,22 +27,589 @@ def random_split(solver):
     """
     Pick a random literal and set it either to True or False.
     """
-    variables = [key for key, value in solver.containment.items()
-                 if len(value) > 0]
+    variables = [literal for literal in solver.clauses.order
+                 if solver.values[abs(literal)] is None]
     literal = random.choice(variables)
     value = random.choice([True, False])
 
     return literal, value
 
 
-def jeroslow_lang(solver):
-    clauses = solver.clauses
+class Heuristic():
+    """
+    Base class for splitting heuristics that keep state between splits.
+    """
+    def setup(self, solver):
+        """
+        Initialize the heuristic for the clauses of a solver.
+        """
+        pass
+
+    def unassign(self, literals):
+        """
+        Called with the literals that are removed from the trail when the
+        solver backtracks, before they are unassigned.
+        """
+        pass
+
+    def conflict(self, literals):
+        """
+        Called with the literals (or variables) involved in a conflict.
+        """
+        pass
+
+    def __call__(self, solver):
+        raise NotImplementedError
+
+
+class ActivityHeap():
+    """
+    Binary max-heap of variables ordered by activity.
+
+    The position of every variable in the heap is indexed, so that
+    changing an activity and checking membership take O(log n) and
+    O(1) respectively. A list of length 2 * max_variable + 1 indexes
+    negative literals from its end, so the heap can hold literals too.
+
+    Parameters
+    ----------
+    activity : list of float
+        Activity of each variable, indexed by variable. The heap reads
+        this list but does not own it.
+    """
+    def __init__(self, activity):
+        self.activity = activity
+        self.heap = []
+        self.positions = [-1] * len(activity)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, variable):
+        return self.positions[variable] >= 0
+
+    def push(self, variable):
+        """
+        Insert a variable if it is not in the heap yet.
+        """
+        if self.positions[variable] >= 0:
+            return
+
+        self.positions[variable] = len(self.heap)
+        self.heap.append(variable)
+        self._sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        """
+        Remove and return the variable with the highest activity.
+        """
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.positions[top] = -1
+
+        if len(heap) > 0:
+            heap[0] = last
+            self.positions[last] = 0
+            self._sift_down(0)
+
+        return top
+
+    def increased(self, variable):
+        """
+        Restore the heap order after the activity of a variable
+        increased.
+        """
+        position = self.positions[variable]
+
+        if position >= 0:
+            self._sift_up(position)
+
+    def changed(self, variable):
+        """
+        Restore the heap order after the activity of a variable
+        increased or decreased.
+        """
+        position = self.positions[variable]
+
+        if position < 0:
+            return
+
+        activity = self.activity
+
+        if position > 0 and activity[variable] \
+                > activity[self.heap[(position - 1) >> 1]]:
+            self._sift_up(position)
+        else:
+            self._sift_down(position)
+
+    def _sift_up(self, position):
+        heap = self.heap
+        positions = self.positions
+        activity = self.activity
+
+        variable = heap[position]
+        value = activity[variable]
+
+        while position > 0:
+            parent = (position - 1) >> 1
+
+            if activity[heap[parent]] >= value:
+                break
+
+            heap[position] = heap[parent]
+            positions[heap[position]] = position
+            position = parent
+
+        heap[position] = variable
+        positions[variable] = position
+
+    def _sift_down(self, position):
+        heap = self.heap
+        positions = self.positions
+        activity = self.activity
+
+        variable = heap[position]
+        value = activity[variable]
+        size = len(heap)
+
+        while True:
+            child = 2 * position + 1
+
+            if child >= size:
+                break
+
+            if child + 1 < size \
+                    and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+
+            if activity[heap[child]] <= value:
+                break
+
+            heap[position] = heap[child]
+            positions[heap[position]] = position
+            position = child
+
+        heap[position] = variable
+        positions[variable] = position
+
+
+class VSIDS(Heuristic):
+    """
+    Variable state independent decaying sum heuristic (in its
+    exponential form, EVSIDS).
+
+    Every variable involved in a conflict has its activity bumped by an
+    increment that grows geometrically after each conflict, which is the
+    same as decaying all other activities. The unassigned variable with
+    the highest activity is picked from an indexed heap and set to the
+    value it had the last time it was assigned (phase saving).
+
+    Parameters
+    ----------
+    decay : float, optional
+        Factor by which old activities decay with each conflict.
+    default_phase : bool, optional
+        Value of a variable that was never assigned before.
+    """
+    def __init__(self, decay=0.95, default_phase=False):
+        self.decay = decay
+        self.default_phase = default_phase
+        self.increment = 1.0
+
+        self.activity = []
+        self.phase = []
+        self.heap = None
+
+    def setup(self, solver):
+        size = solver.clauses.max_variable + 1
+
+        self.activity = [0.0] * size
+        self.phase = [self.default_phase] * size
+        self.heap = ActivityHeap(self.activity)
+
+        for literal in solver.clauses.order:
+            self.heap.push(abs(literal))
+
+    def unassign(self, literals):
+        for literal in literals:
+            variable = abs(literal)
+            self.phase[variable] = literal > 0
+            self.heap.push(variable)
+
+    def conflict(self, literals):
+        activity = self.activity
+
+        for literal in literals:
+            variable = abs(literal)
+            activity[variable] += self.increment
+
+            if activity[variable] > 1e100:
+                self._rescale()
+
+            self.heap.increased(variable)
+
+        self.increment /= self.decay
+
+    def _rescale(self):
+        """
+        Scale down all activities to prevent them from overflowing.
+        """
+        for variable in range(len(self.activity)):
+            self.activity[variable] *= 1e-100
+
+        self.increment *= 1e-100
+
+    def __call__(self, solver):
+        values = solver.values
+
+        while True:
+            variable = self.heap.pop()
+
+            if values[variable] is None:
+                return variable, self.phase[variable]
+
+
+class ClauseCountHeuristic(Heuristic):
+    """
+    Base class for heuristics that score literals by the unsatisfied
+    clauses they occur in.
+
+    Instead of scanning the clauses on every split, the number of true
+    and open literals of each clause is kept up to date as the solver
+    assigns and unassigns literals. Whenever a clause gets satisfied or
+    loses a literal, `_change` is called for each of its open literals to
+    withdraw the contribution of the clause at its old size and add the
+    one at its new size. Assignments are picked up from the solver's
+    trail when the next split is requested, and undone when the solver
+    backtracks past them.
+
+    The candidates are kept in indexed heaps that are reordered with
+    every score change, so a split does not scan the free variables.
+    Assigned candidates are only dropped when they reach the top of a
+    heap, and pushed back when the solver unassigns them.
+    """
+    def __init__(self):
+        self.heaps = []
+        self.solver = None
+        self.state = []
+        self.processed = 0
+        self.true_count = []
+        self.free_count = []
+        self.active = []
+        self.variables = []
+
+    def setup(self, solver):
+        clauses = solver.clauses
+
+        self.solver = solver
+        self.state = [None] * (clauses.max_variable + 1)
+        self.processed = 0
+        self.true_count = [0] * len(clauses)
+        self.free_count = list(clauses.lengths)
+        self.active = [0] * (max(clauses.lengths, default=0) + 1)
+        self.variables = sorted(clauses.variables())
+
+        for idx, clause in enumerate(clauses):
+            self.active[len(clause)] += 1
+
+            for literal in clause:
+                self._change(literal, len(clause), 1)
+
+    def _change(self, literal, size, delta):
+        """
+        Add (`delta` is 1) or withdraw (`delta` is -1) the contribution
+        of an unsatisfied clause with `size` open literals to the score
+        of `literal`.
+        """
+        raise NotImplementedError
+
+    def _update(self, idx, size, delta, skip=None):
+        """
+        Change the contribution of clause `idx` with `size` open
+        literals for every open literal other than `skip`.
+        """
+        state = self.state
+
+        for literal in self.solver.clauses[idx]:
+            if state[abs(literal)] is None and literal != skip:
+                self._change(literal, size, delta)
+
+    def _assign(self, literal):
+        clauses = self.solver.clauses
+        true_count = self.true_count
+        free_count = self.free_count
+
+        for idx in clauses.occurrences_of(literal):
+            true_count[idx] += 1
+
+            if true_count[idx] == 1:
+                # The clause just got satisfied.
+                self._update(idx, free_count[idx], -1)
+                self.active[free_count[idx]] -= 1
+
+            free_count[idx] -= 1
+
+        for idx in clauses.occurrences_of(-literal):
+            if true_count[idx] == 0:
+                # The clause shrinks by one literal.
+                size = free_count[idx]
+                self._update(idx, size, -1)
+                self._update(idx, size - 1, 1, skip=-literal)
+                self.active[size] -= 1
+                self.active[size - 1] += 1
+
+            free_count[idx] -= 1
+
+        self.state[abs(literal)] = literal > 0
+
+    def _unassign(self, literal):
+        clauses = self.solver.clauses
+        true_count = self.true_count
+        free_count = self.free_count
+
+        self.state[abs(literal)] = None
+
+        for idx in clauses.occurrences_of(-literal):
+            free_count[idx] += 1
+
+            if true_count[idx] == 0:
+                size = free_count[idx]
+                self._update(idx, size - 1, -1, skip=-literal)
+                self._update(idx, size, 1)
+                self.active[size - 1] -= 1
+                self.active[size] += 1
+
+        for idx in clauses.occurrences_of(literal):
+            free_count[idx] += 1
+            true_count[idx] -= 1
+
+            if true_count[idx] == 0:
+                self._update(idx, free_count[idx], 1)
+                self.active[free_count[idx]] += 1
+
+    def unassign(self, literals):
+        mark = len(self.solver.trail) - len(literals)
+
+        for literal in reversed(self.solver.trail[mark:self.processed]):
+            self._unassign(literal)
+
+        self.processed = min(self.processed, mark)
+
+        for literal in literals:
+            items = self._items(abs(literal))
+
+            for heap in self.heaps:
+                if heap is not None:
+                    for item in items:
+                        heap.push(item)
+
+    def _items(self, variable):
+        """
+        The heap items of a variable: the variable itself, or both of
+        its literals for heuristics that rank literals.
+        """
+        return (variable,)
+
+    def _fill(self, heap):
+        """
+        Push the items of every variable into a heap.
+        """
+        for variable in self.variables:
+            for item in self._items(variable):
+                heap.push(item)
+
+    def _pop_free(self, heap):
+        """
+        Pop the best item of a heap whose variable is unassigned,
+        dropping the assigned ones above it.
+        """
+        values = self.solver.values
+
+        while True:
+            item = heap.pop()
+
+            if values[abs(item)] is None:
+                return item
+
+    def _catch_up(self):
+        """
+        Process the assignments made since the previous split.
+        """
+        trail = self.solver.trail
+
+        while self.processed < len(trail):
+            self._assign(trail[self.processed])
+            self.processed += 1
+
+
+class JeroslowWang(ClauseCountHeuristic):
+    """
+    Jeroslow-Wang heuristic.
+
+    Every unsatisfied clause with k open literals adds 2 ** -k to the
+    score of each of its open literals. The one-sided variant sets the
+    literal with the highest score to True; the two-sided variant picks
+    the variable with the highest combined score of both its literals
+    and sets it to the value of its best literal.
+
+    Parameters
+    ----------
+    two_sided : bool, optional
+        Use the two-sided variant.
+    """
+    def __init__(self, two_sided=False):
+        super(JeroslowWang, self).__init__()
+
+        self.two_sided = two_sided
+        self.score = []
+        self.combined = []
+        self.weights = []
+        self.heap = None
+
+    def setup(self, solver):
+        longest = max(solver.clauses.lengths, default=0)
+
+        self.weights = [2.0 ** -size for size in range(longest + 1)]
+        self.score = [0.0] * (2 * solver.clauses.max_variable + 1)
+        self.combined = [0.0] * (solver.clauses.max_variable + 1)
+
+        # The heap is filled once the scores are counted.
+        self.heap = ActivityHeap(self.combined if self.two_sided
+                                 else self.score)
+        self.heaps = [self.heap]
+
+        super(JeroslowWang, self).setup(solver)
+
+        self._fill(self.heap)
+
+    def _items(self, variable):
+        if self.two_sided:
+            return (variable,)
+
+        return (variable, -variable)
+
+    def _change(self, literal, size, delta):
+        # Sums of powers of two stay exact, so scores do not drift.
+        weight = delta * self.weights[size]
+        self.score[literal] += weight
+
+        if self.two_sided:
+            self.combined[abs(literal)] += weight
+            self.heap.changed(abs(literal))
+        else:
+            self.heap.changed(literal)
+
+    def __call__(self, solver):
+        self._catch_up()
+        score = self.score
+
+        if self.two_sided:
+            variable = self._pop_free(self.heap)
+
+            return variable, score[variable] >= score[-variable]
+
+        return self._pop_free(self.heap), True
+
+
+class DLIS(ClauseCountHeuristic):
+    """
+    Dynamic largest individual sum.
+
+    Sets the literal that occurs in the most unsatisfied clauses to True.
+    """
+    def __init__(self):
+        super(DLIS, self).__init__()
+
+        self.count = []
+        self.heap = None
+
+    def setup(self, solver):
+        self.count = [0] * (2 * solver.clauses.max_variable + 1)
+
+        # The heap is filled once the counts are known.
+        self.heap = ActivityHeap(self.count)
+        self.heaps = [self.heap]
+
+        super(DLIS, self).setup(solver)
+
+        self._fill(self.heap)
+
+    def _items(self, variable):
+        return (variable, -variable)
+
+    def _change(self, literal, size, delta):
+        self.count[literal] += delta
+        self.heap.changed(literal)
+
+    def __call__(self, solver):
+        self._catch_up()
+
+        return self._pop_free(self.heap), True
+
+
+class MOMs(ClauseCountHeuristic):
+    """
+    Maximum occurrences in clauses of minimum size.
+
+    With f(l) the number of occurrences of literal l in the smallest
+    unsatisfied clauses, the variable x maximizing
+    (f(x) + f(-x)) * 2 ** exponent + f(x) * f(-x) is picked and set to
+    the value of its most frequent literal.
+
+    Every clause size has its own heap of variables ordered by that
+    score, built the first time the smallest clauses have that size.
+
+    Parameters
+    ----------
+    exponent : int, optional
+        Weight of the total number of occurrences relative to their
+        balance.
+    """
+    def __init__(self, exponent=1):
+        super(MOMs, self).__init__()
+
+        self.exponent = exponent
+        self.count = []
+        self.keys = []
+
+    def setup(self, solver):
+        longest = max(solver.clauses.lengths, default=0)
+        size = 2 * solver.clauses.max_variable + 1
+
+        self.count = [[0] * size for _ in range(longest + 1)]
+        self.keys = [None] * (longest + 1)
+        self.heaps = [None] * (longest + 1)
+
+        super(MOMs, self).setup(solver)
+
+    def _key(self, count, variable):
+        return (count[variable] + count[-variable]) * 2 ** self.exponent \
+            + count[variable] * count[-variable]
+
+    def _change(self, literal, size, delta):
+        count = self.count[size]
+        count[literal] += delta
+
+        if self.heaps[size] is not None:
+            variable = abs(literal)
+            self.keys[size][variable] = self._key(count, variable)
+            self.heaps[size].changed(variable)
+
+    def __call__(self, solver):
+        self._catch_up()
+
+        smallest = next((size for size in range(1, len(self.active))
+                         if self.active[size] > 0), 0)
+        count = self.count[smallest]
 
-    j_values = {}
+        if self.heaps[smallest] is None:
+            self.keys[smallest] = [
+                self._key(count, variable) for variable
+                in range(solver.clauses.max_variable + 1)]
+            self.heaps[smallest] = ActivityHeap(self.keys[smallest])
+            self._fill(self.heaps[smallest])
 
-    for literal, indices in solver.containment.items():
-        print(literal, indices)
-        J = sum([2 ** -len(clauses[idx]) for idx in indices])
-        print(J)
+        variable = self._pop_free(self.heaps[smallest])
 
-        j_values[literal] = J
+        return variable, count[variable] >= count[-variable]
@@ -1,13 +1,33 @@
 import os
+import re
+import gzip
+import hashlib
+import lzma
+import warnings
 
-from copy import deepcopy
+from array import array
+from itertools import accumulate, chain, repeat
+from operator import add
+
+from database import ClauseDatabase
 
 EXAMPLE_PATH = 'example.txt'
 RULES_PATH = 'sudoku-rules.cnf'
+CACHE_PATH = '.cnf_cache'
+
+# Rulesets loaded by `load_rules`, by path.
+RULES = {}
 PATHS = ['damnhard.sdk.txt', 'top91.sdk.txt', 'top95.sdk.txt',
          'top100.sdk.txt', 'top870.sdk.txt', 'top2365.sdk.txt',
          '1000_sudokus.txt', 'top2365.sdk.txt', 'subig20.sdk.txt']
 
+CHUNK_SIZE = 1 << 20
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+
+# Comment, header and end-of-data lines.
+SPECIAL_LINE = re.compile(rb'^[ \t]*([cp%])', re.MULTILINE)
+
 
 def load_raw_sudokus(path):
     """
@@ -78,76 +98,337 @@ def raw2dimacs(raw):
     return lines
 
 
-def load_dimacs(path):
+def open_dimacs(path):
     """
-    Load a DIMACS CNF format file.
+    Open a DIMACS file for binary reading, decompressing gzip and xz files
+    on the fly.
+
+    The compression is detected from the first bytes of the file, so the
+    file extension does not matter.
+    """
+    with open(path, 'rb') as raw:
+        magic = raw.read(6)
+
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    elif magic.startswith(XZ_MAGIC):
+        return lzma.open(path, 'rb')
+
+    return open(path, 'rb')
+
+
+def read_dimacs(path, chunk_size=CHUNK_SIZE):
+    """
+    Parse a DIMACS CNF file into a clause database.
+
+    The file is streamed in large chunks and tokenized in a single pass.
+    Comment lines are skipped and the `p cnf` header is used to
+    preallocate the clause lengths and to validate the literals. Several
+    headers may occur when CNF files have been concatenated. A literal
+    that was glued onto the clause count of a header, as in
+    `p cnf 999 12016042 0` followed by a repeated `p cnf 999 12016`
+    header, is split off again.
+
+    Parameters
+    ----------
+    path : str
+        Path to a plain, gzip or xz compressed DIMACS file.
+    chunk_size : int, optional
+        Number of bytes read at once.
 
     Returns
     -------
-    list of set
-        A list of clauses. Each clause is a set of variables.
+    ClauseDatabase
+
+    Raises
+    ------
+    ValueError
+        If a header or a literal is malformed, or a literal exceeds the
+        declared number of variables.
     """
-    clauses = []
+    literals = array('i')
+    lengths = array('i')
+    num_clauses = 0
 
-    with open(path) as text:
-        lines = [line for line in text if 'c' not in line and 'p' not in line]
+    # A header can not declare more clauses than the file has bytes.
+    max_clauses = os.path.getsize(path)
+
+    headers = []
+    glued = None
+    pending = []
+
+    def add_clauses(data):
+        # Split a run of literals into clauses at the zero terminators.
+        nonlocal num_clauses, pending
+
+        try:
+            tokens = pending + list(map(int, data.split()))
+        except ValueError:
+            raise ValueError(f"Malformed literal in {path}") from None
+
+        find = tokens.index
+        count = num_clauses
+        allocated = len(lengths)
+        start = 0
+
+        try:
+            while True:
+                end = find(0, start)
+
+                if count < allocated:
+                    lengths[count] = end - start
+                else:
+                    lengths.append(end - start)
+
+                count += 1
+                start = end + 1
+        except ValueError:
+            pass
+
+        num_clauses = count
+
+        literals.extend(filter(None, tokens[:start]))
+        pending = tokens[start:]
+
+    def add_header(line):
+        nonlocal glued
+
+        fields = line.split()
+
+        if len(fields) < 4 or fields[1] != b'cnf':
+            raise ValueError(f"Malformed DIMACS header: {line!r}")
+
+        try:
+            variables, clauses = int(fields[2]), int(fields[3])
+            trailing = [int(field) for field in fields[4:]]
+        except ValueError:
+            raise ValueError(f"Malformed DIMACS header: {line!r}") from None
+
+        if trailing == [0] and len(pending) == 0:
+            # A header that ends in a bare terminator had the first
+            # literal of the next clause glued onto its clause count.
+            glued = (variables, fields[3], num_clauses)
+            trailing = []
+        else:
+            # Preallocate the clause lengths for the declared count.
+            missing = min(num_clauses + clauses, max_clauses) - len(lengths)
+
+            if missing > 0:
+                lengths.extend(array('i', bytes(4 * missing)))
+
+        headers.append((variables, clauses))
+
+        if trailing:
+            add_clauses(b' '.join(fields[4:]))
+
+    with open_dimacs(path) as stream:
+        rest = b''
+
+        while True:
+            chunk = stream.read(chunk_size)
+
+            if chunk:
+                # Only hand complete lines to the tokenizer.
+                chunk = rest + chunk
+                cut = chunk.rfind(b'\n') + 1
+                chunk, rest = chunk[:cut], chunk[cut:]
+            else:
+                chunk, rest = rest, b''
+
+                if not chunk:
+                    break
+
+            position = 0
+
+            for match in SPECIAL_LINE.finditer(chunk):
+                add_clauses(chunk[position:match.start()])
+
+                position = chunk.find(b'\n', match.end())
+                position = len(chunk) if position < 0 else position + 1
+                kind = match.group(1)
+
+                if kind == b'p':
+                    add_header(chunk[match.start():position])
+                elif kind == b'%':
+                    # SATLIB files end the clauses with a percent sign.
+                    break
+            else:
+                add_clauses(chunk[position:])
+                continue
 
-    lines = ''.join(lines)
-    lines = lines.replace('\n', ' ')
-    lines = lines.replace('\t', ' ')
-    lines = lines.replace('\r', ' ')
-    lines = lines.split(' 0')
+            break
 
-    for line in lines:
-        variables = line.split()
+    if len(pending) > 0:
+        # The last clause may omit its terminator.
+        add_clauses(b'0')
 
-        if len(variables) is 0:
-            continue
+    del lengths[num_clauses:]
 
-        # variables = [variable for variable in variables if variable != '0']
+    if glued is not None:
+        variables, count, position = glued
+        prefixes = [str(clauses).encode() for header_variables, clauses
+                    in headers if header_variables == variables]
+        prefixes = [prefix for prefix in prefixes
+                    if count.startswith(prefix) and count != prefix]
 
-        clause = {
-            int(variable)
-            for variable in variables
-        }
+        if prefixes:
+            literals.insert(sum(lengths[:position]),
+                            int(count[len(prefixes[0]):]))
+            lengths.insert(position, 1)
+        else:
+            warnings.warn(f"{path}: ignoring the clause terminator on a "
+                          "DIMACS header line")
 
-        clauses.append(clause)
+    max_variable = max(max(literals, default=0), -min(literals, default=0))
 
-        '''
-        for line in text:
-            if 'p' in line or 'c' in line:
-                continue
+    if headers:
+        declared = max(variables for variables, clauses in headers)
+
+        if max_variable > declared:
+            raise ValueError(f"{path}: literal exceeds the {declared} "
+                             "variables declared in the header")
+
+    # Number every (clause, literal) pair, these are unique unless a
+    # clause repeats a literal, which only then needs the slow path.
+    stride = 2 * max_variable + 1
+    pairs = map(add, literals, chain.from_iterable(
+        map(repeat, range(0, stride * len(lengths), stride), lengths)))
+
+    if len(set(pairs)) != len(literals):
+        literals, lengths = _unique_literals(literals, lengths)
+
+    # One offset per clause, so a file without clauses has none.
+    offsets = array('i', accumulate(lengths, initial=0))
+    offsets.pop()
+
+    return ClauseDatabase(literals, offsets, lengths, max_variable)
+
+
+def _unique_literals(literals, lengths):
+    """
+    Drop repeated literals from back to back clauses.
+    """
+    unique = array('i')
+    unique_lengths = array('i')
+    start = 0
+
+    for length in lengths:
+        clause = dict.fromkeys(literals[start:start + length])
+        unique.extend(clause)
+        unique_lengths.append(len(clause))
+        start += length
+
+    return unique, unique_lengths
+
+
+def load_database(path, cache=CACHE_PATH):
+    """
+    Load a DIMACS CNF file as a clause database, through a binary cache.
+
+    The first load parses the file and saves the database in the cache
+    directory. Later loads memory map the saved database as long as the
+    modification time and size of the file are unchanged.
 
-            line = line.strip("0 \n")
+    Parameters
+    ----------
+    path : str
+        Path to a DIMACS file.
+    cache : str or None, optional
+        Directory of the cache, or None to always parse the file.
+
+    Returns
+    -------
+    ClauseDatabase
+    """
+    if cache is None:
+        return read_dimacs(path)
+
+    status = os.stat(path)
+    source = (status.st_mtime_ns, status.st_size)
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    cached = os.path.join(cache, f"{key}.cnfdb")
+
+    try:
+        database = ClauseDatabase.load(cached)
+
+        if database.source == source:
+            return database
+    except (OSError, ValueError):
+        pass
+
+    database = read_dimacs(path)
+    database.source = source
 
-            variables = line.split()
-            clause = {
-                int(variable)
-                for variable in variables
-            }
+    try:
+        os.makedirs(cache, exist_ok=True)
+        database.save(cached)
+    except OSError:
+        # Caching is only an optimisation.
+        pass
 
-            if clause != set():
-                clauses.append(clause)
-        '''
+    return database
 
-    return clauses
+
+def load_dimacs(path):
+    """
+    Load a DIMACS CNF format file.
+
+    Returns
+    -------
+    list of set
+        A list of clauses. Each clause is a set of variables.
+    """
+    return load_database(path).to_clauses()
+
+
+def load_rules(path=RULES_PATH):
+    """
+    Load the sudoku ruleset as a shared, read-only clause database.
+
+    The rules are loaded and indexed once, later calls return the same
+    database.
+
+    Returns
+    -------
+    ClauseDatabase
+    """
+    if path not in RULES:
+        RULES[path] = load_database(path).readonly()
+
+    return RULES[path]
 
 
 def load_games(path):
     """
-    Load sudoku games as lists of clauses from raw puzzles and the ruleset.
+    Load sudoku games from raw puzzles and the ruleset.
+
+    Every game shares the indexed ruleset and only adds its givens as
+    unit clauses.
 
     Yields
     ------
-    list of set
-        A list of clauses. Each clause is a set of variables.
+    ClauseDatabase
+        The rules followed by the givens of a puzzle.
     """
-    rules = load_dimacs(RULES_PATH)
+    rules = load_rules()
 
     for raw in load_raw_sudokus(path):
-        sudoku = read_raw_sudoku(raw)
+        yield rules.with_clauses(read_raw_sudoku(raw))
 
-        yield deepcopy(sudoku + rules)
+
+def load_givens(path):
+    """
+    Load the givens of raw sudoku puzzles, to be solved against a shared
+    ruleset.
+
+    Yields
+    ------
+    list of int
+        The literals that are true in a puzzle.
+    """
+    for raw in load_raw_sudokus(path):
+        yield [literal for clause in read_raw_sudoku(raw)
+               for literal in clause]
 
 
 def load_all_games():
@@ -170,13 +451,10 @@ def load_example():
 
     Returns
     -------
-    list of set
-        A list of clauses. Each clause is a set of variables.
+    ClauseDatabase
+        The rules followed by the givens of the example.
     """
-    rules = load_dimacs(RULES_PATH)
-    example = load_dimacs(EXAMPLE_PATH)
-
-    return deepcopy(example + rules)
+    return load_rules().with_clauses(load_database(EXAMPLE_PATH))
 
 
 def draw_assignment(assignment):
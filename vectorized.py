@@ -0,0 +1,281 @@
+"""
+Local search on many assignments at once with NumPy.
+
+NumPy is only needed by this module, which `solver.select_solver` only
+imports when the vectorized strategy is selected.
+"""
+import time
+import random
+
+import numpy as np
+
+from solver import Solver
+
+
+class VectorWalkSAT(Solver):
+    """
+    WalkSAT on `chains` independent assignments in parallel.
+
+    The clauses are stored as a matrix of the variables of their
+    literals, padded with a variable 0 that is always false, and each
+    variable has a padded row of the clauses it occurs in. All
+    assignments form one 2-D boolean array, and the number of true
+    literals and the sum of their variables are kept for every clause of
+    every assignment, so a clause with one true literal names its
+    critical variable. Every step flips one variable in each assignment:
+    a variable of a random unsatisfied clause that breaks no clauses if
+    there is one, otherwise a random one with probability `noise` and
+    one that breaks the fewest clauses else.
+
+    Parameters
+    ----------
+    clauses : ClauseDatabase or iterable of iterable of int
+    chains : int, optional
+        Number of assignments that are searched in parallel.
+    noise : float, optional
+        Probability of a random flip when every flip breaks a clause.
+    """
+    def __init__(self, clauses, chains=32, noise=0.5):
+        super(VectorWalkSAT, self).__init__(clauses)
+
+        self.chains = chains
+        self.noise = noise
+
+        self.max_tries = 10
+        self.max_flips = 10000
+        self.restarts = 0
+        self.flips = 0
+        self.total_flips = 0
+        self.try_start = 0
+
+        # Fewest unsatisfied clauses of any assignment.
+        self.unsatisfied = None
+
+    @property
+    def flips_per_second(self):
+        """
+        Average number of flips per second over all tries and chains.
+        """
+        if self.search_time == 0:
+            return 0.0
+
+        return self.total_flips / self.search_time
+
+    def solve(self):
+        """
+        Run the vectorized WalkSAT.
+
+        Returns
+        -------
+        bool or None
+            True if a solution was found, False if propagating the unit
+            clauses already ran into a conflict and None if the search
+            gave up.
+        """
+        start = time.perf_counter()
+        setup_time = self.setup_time
+        self._start_budget()
+
+        try:
+            with self._reporter():
+                return self._walk()
+        finally:
+            # Building the matrices is setup, not search.
+            self.search_time += time.perf_counter() - start \
+                - (self.setup_time - setup_time)
+
+    def _setup(self):
+        """
+        Simplify the clauses and build the literal and occurrence
+        matrices.
+
+        Returns
+        -------
+        bool
+            False if the clauses are unsatisfiable, True otherwise.
+        """
+        self._remove_tautologies()
+
+        if not self._simplify():
+            return False
+
+        clauses = self.clauses
+        lengths = np.asarray(clauses.lengths, dtype=np.int64)
+        offsets = np.asarray(clauses.offsets, dtype=np.int64)
+        literals = np.asarray(clauses.literals, dtype=np.int64)
+
+        # Number the variables that are left from 1, 0 is the padding.
+        self.variables = np.array(sorted(clauses.variables()),
+                                  dtype=np.int64)
+        number = np.zeros(clauses.max_variable + 1, dtype=np.int64)
+        number[self.variables] = np.arange(1, len(self.variables) + 1)
+
+        num_clauses = len(lengths)
+        width = int(lengths.max(initial=0))
+        rows = np.repeat(np.arange(num_clauses), lengths)
+        columns = np.arange(len(rows)) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        flat = literals[np.repeat(offsets, lengths) + columns]
+
+        self.literal_variable = np.zeros((num_clauses, width), dtype=np.int64)
+        self.literal_sign = np.ones((num_clauses, width), dtype=bool)
+        self.literal_variable[rows, columns] = number[np.abs(flat)]
+        self.literal_sign[rows, columns] = flat > 0
+
+        # Padded occurrences point at an extra clause that is never read.
+        occurring = number[np.abs(flat)]
+        order = np.argsort(occurring, kind='stable')
+        counts = np.bincount(occurring, minlength=len(self.variables) + 1)
+        depth = int(counts.max(initial=0))
+        position = np.arange(len(order)) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+
+        self.occurrence = np.full((len(counts), depth), num_clauses,
+                                  dtype=np.int64)
+        self.occurrence_sign = np.zeros((len(counts), depth), dtype=bool)
+        self.occurrence_valid = np.zeros((len(counts), depth), dtype=bool)
+        self.occurrence[occurring[order], position] = rows[order]
+        self.occurrence_sign[occurring[order], position] = flat[order] > 0
+        self.occurrence_valid[occurring[order], position] = True
+
+        return True
+
+    def _guess_assignments(self, rng):
+        """
+        Guess a random assignment for every chain and count the true
+        literals of every clause.
+        """
+        num_clauses = len(self.literal_variable)
+
+        values = rng.random((self.chains, len(self.variables) + 1)) < 0.5
+        values[:, 0] = False
+
+        true = values[:, self.literal_variable] == self.literal_sign
+        self.values_matrix = values
+        self.true_count = np.zeros((self.chains, num_clauses + 1),
+                                   dtype=np.int64)
+        self.true_sum = np.zeros((self.chains, num_clauses + 1),
+                                 dtype=np.int64)
+        self.true_count[:, :num_clauses] = true.sum(2)
+        self.true_sum[:, :num_clauses] = (true * self.literal_variable).sum(2)
+
+    def _walk(self):
+        start = time.perf_counter()
+        prepared = self._setup()
+        self.setup_time += time.perf_counter() - start
+
+        if not prepared:
+            return False
+
+        # Seeded from `random`, so that seeding it fixes the search.
+        rng = np.random.default_rng(random.getrandbits(64))
+        chains = np.arange(self.chains)
+        num_clauses = len(self.literal_variable)
+        step = 0
+
+        for retry in range(self.max_tries):
+            start = time.perf_counter()
+            self._guess_assignments(rng)
+            self.setup_time += time.perf_counter() - start
+
+            self.restarts = retry
+            self.try_start = self.total_flips
+
+            if self.tracer is not None:
+                self.tracer.on_restart(self)
+
+            for flip in range(self.max_flips):
+                unsat = self.true_count[:, :num_clauses] == 0
+                counts = unsat.sum(1)
+                self.unsatisfied = int(counts.min())
+
+                if self.unsatisfied == 0:
+                    self.flips = flip
+                    self._keep_assignment(int(counts.argmin()))
+                    return True
+
+                if self._out_of_flips(step):
+                    self.flips = flip
+                    return None
+
+                step += 1
+                self._step(rng, chains, unsat)
+
+            self.flips = self.max_flips
+
+        # Local search can not prove that there is no solution.
+        self.exhausted = 'tries'
+        return None
+
+    def _step(self, rng, chains, unsat):
+        """
+        Flip one variable of an unsatisfied clause in every chain.
+        """
+        true_count = self.true_count
+        true_sum = self.true_sum
+
+        # A random unsatisfied clause of each chain.
+        keys = rng.random(unsat.shape)
+        keys[~unsat] = -1
+        clause = keys.argmax(1)
+
+        candidates = self.literal_variable[clause]
+        valid = candidates != 0
+
+        # Count the clauses in which each candidate is critical.
+        occurrence = self.occurrence[candidates]
+        column = chains[:, None, None]
+        breaks = ((true_count[column, occurrence] == 1)
+                  & (true_sum[column, occurrence] == candidates[:, :, None])
+                  & self.occurrence_valid[candidates]).sum(2)
+
+        # Break ties at random, padding is never picked.
+        scores = breaks + 0.5 * rng.random(candidates.shape)
+        scores[~valid] = np.inf
+        best = scores.argmin(1)
+
+        keys = rng.random(candidates.shape)
+        keys[~valid] = -1
+        walk = (scores.min(1) >= 1) & (rng.random(self.chains) < self.noise)
+        pick = np.where(walk, keys.argmax(1), best)
+
+        variable = candidates[chains, pick]
+        value = ~self.values_matrix[chains, variable]
+        self.values_matrix[chains, variable] = value
+        self.total_flips += self.chains
+
+        occurrence = self.occurrence[variable]
+        occurrence_valid = self.occurrence_valid[variable]
+        delta = np.where(self.occurrence_sign[variable] == value[:, None],
+                         1, -1) * occurrence_valid
+
+        true_count[chains[:, None], occurrence] += delta
+        true_sum[chains[:, None], occurrence] += delta * variable[:, None]
+
+        if self.count_clause_visits:
+            self.clause_visits += int(occurrence_valid.sum())
+
+        if self.tracer is not None:
+            self.tracer.on_flip(self, variable)
+
+    def _keep_assignment(self, chain):
+        """
+        Copy the assignment of a chain to the values of the solver.
+        """
+        values = self.values_matrix[chain]
+
+        for idx, variable in enumerate(self.variables.tolist()):
+            self.values[variable] = bool(values[idx + 1])
+
+        # Variables that were removed with their clauses are free.
+        for variable in range(1, len(self.values)):
+            if self.values[variable] is None:
+                self.values[variable] = False
+
+    def _progress(self):
+        """
+        Describe the progress of the best chain.
+        """
+        return (f"{self.restarts}:{self.total_flips - self.try_start} | "
+                f"Unsatisfied: {self.unsatisfied} | "
+                f"Chains: {self.chains}")